@@ -1,10 +1,38 @@
 # Flask 웹 프레임워크, 문자열 템플릿, 폼처리, 리다이렉트를 사용
-from flask import Flask, render_template_string, request, redirect, url_for
+from flask import Flask, Request, render_template, render_template_string, request, redirect, url_for, jsonify, make_response, send_from_directory
+from jinja2 import ChoiceLoader, DictLoader, FileSystemBytecodeCache # 💜 템플릿을 한 번만 컴파일해서 재사용
+from markupsafe import Markup, escape # 💜 검색 결과 발췌(snippet)의 강조 표시만 HTML로 살리기 위해 사용
+import click
 import json # 줄바꿈/특수문자 포함 본문을 안전하게 파일에 저장하기 위해 사용(JSON Lines)
+import hashlib # 💜 ETag 만들기
+import mimetypes
 from datetime import datetime # ✅ 댓글 작성 시각 기록용 import
-from werkzeug.utils import secure_filename # 이미지 파일 업로드 기능 추가하며 새로 생긴 코드
 from pathlib import Path
+from werkzeug.exceptions import BadRequest
 import uuid
+import os
+from collections import Counter, OrderedDict # 💜 렌더링된 페이지 LRU 캐시, 이미지 참조 수
+import time
+import sqlite3 # 💜 SQLite 저장소(POST_STORE='sqlite')
+import bisect # 💜 저널에서 삭제된 위치 목록을 정렬된 상태로 유지
+import tempfile
+import re
+from abc import ABC, abstractmethod # 💜 저장소 인터페이스(PostStore): 빠진 메서드가 있으면 만들 때 바로 TypeError
+import struct # 💜 오프셋 인덱스 파일을 고정 길이 바이너리 레코드로 쓰기 위해 사용
+import threading # 💜 읽기 캐시를 여러 요청 스레드가 함께 쓰기 때문에 Lock 사용
+from concurrent.futures import ThreadPoolExecutor # 💜 썸네일을 요청 스레드 밖에서 만들기
+try:
+    import fcntl # 💜 여러 워커 프로세스 간 쓰기 락 (유닉스 전용)
+except ImportError:
+    fcntl = None
+try:
+    import orjson # 💜 (선택) 빠른 JSON 디코더: pip install orjson. 없으면 표준 json 사용
+except ImportError:
+    orjson = None
+try:
+    from PIL import Image, ImageOps, features # 💜 (선택) 업로드 이미지 썸네일: pip install Pillow. 없으면 원본만 보여줌
+except ImportError:
+    Image = None
 
 # Flask 앱 객체 생성
 app = Flask(__name__)
@@ -17,165 +45,2739 @@ UPLOAD_DIR.mkdir(parents=True, exist_ok=True) # 폴더 자동생성
 
 FILE_PATH = BASE_DIR / "posts.txt" # Json Lines 데이터 파일
 ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "gif", "webp"}
+IMAGE_REJECTED = "이미지는 png, jpg, jpeg, gif, webp 파일만 올릴 수 있습니다." # 허용되지 않는 파일을 올렸을 때 (400)
 app.config["MAX_CONTENT_LENGTH"] = 8 * 1024 * 1024 # 8MB(원하면 조절 하면 됨) 
 
 def allowed_file(filename: str) -> bool:
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
 
+# 💜 이미지 검사: 확장자만 믿지 않고 파일 앞부분(매직 바이트)으로 형식을, 헤더로 가로/세로 크기를 확인
+# - 이미지 전체를 디코딩하지 않음: PNG(IHDR)/GIF(화면 크기)/WebP(VP8/VP8L/VP8X)는 앞 30바이트 안,
+#   JPEG는 세그먼트 길이만 보고 건너뛰며 SOF 마커까지 (EXIF/ICC가 커도 IMAGE_SNIFF_BYTES 안에서)
+# - 받는 도중(UploadRequest)에 검사 -> 이미지가 아니거나 너무 크면 나머지 본문을 디스크에 쓰기 전에 400으로 끊음
+#   (픽셀 수 제한은 썸네일을 만들 때 메모리를 터뜨리는 "압축 폭탄" 이미지도 막음)
+# - 저장할 확장자는 파일 이름이 아니라 실제 형식 기준 (이름만 .png인 JPEG도 .jpg로)
+app.config.setdefault('IMAGE_MAX_PIXELS', 40_000_000)
+app.config.setdefault('IMAGE_MAX_SIDE', 16_383) # WebP가 담을 수 있는 최대 폭/높이
+app.config.setdefault('IMAGE_SNIFF_BYTES', 512 * 1024)
+
+class ImageRejected(BadRequest):
+    """업로드가 이미지가 아니거나 허용 크기를 넘음 (400)."""
+
+@app.errorhandler(ImageRejected)
+def image_rejected(e):
+    return e.description, 400
+
+_IMAGE_SIGNATURES = ((b'\x89PNG\r\n\x1a\n', 'png'), (b'GIF87a', 'gif'), (b'GIF89a', 'gif'), (b'\xff\xd8\xff', 'jpg'),
+                     (b'RIFF', 'webp'))
+
+def _image_size(head, kind):
+    # 형식별 헤더에서 (가로, 세로). 아직 바이트가 모자라면 None
+    if kind == 'png':
+        if len(head) < 24:
+            return None
+        if head[12:16] != b'IHDR':
+            raise ImageRejected(IMAGE_REJECTED)
+        return struct.unpack('>II', head[16:24])
+    if kind == 'gif':
+        return struct.unpack('<HH', head[6:10]) if len(head) >= 10 else None
+    if kind == 'webp':
+        if len(head) < 30:
+            return None
+        chunk = head[12:16]
+        if head[8:12] != b'WEBP':
+            raise ImageRejected(IMAGE_REJECTED)
+        if chunk == b'VP8 ' and head[23:26] == b'\x9d\x01\x2a':
+            w, h = struct.unpack('<HH', head[26:30])
+            return w & 0x3fff, h & 0x3fff
+        if chunk == b'VP8L' and head[20] == 0x2f:
+            bits = int.from_bytes(head[21:25], 'little')
+            return (bits & 0x3fff) + 1, ((bits >> 14) & 0x3fff) + 1
+        if chunk == b'VP8X':
+            return int.from_bytes(head[24:27], 'little') + 1, int.from_bytes(head[27:30], 'little') + 1
+        raise ImageRejected(IMAGE_REJECTED)
+    # jpg: FFD8 다음 세그먼트들을 길이만 보고 건너뛰다가 SOFn(C0~CF, C4/C8/CC 제외)에서 크기를 읽음
+    i = 2
+    while True:
+        if i + 4 > len(head):
+            return None
+        if head[i] != 0xff:
+            raise ImageRejected(IMAGE_REJECTED)
+        marker = head[i + 1]
+        if marker == 0xff: # 채움 바이트
+            i += 1
+            continue
+        if marker == 0x01 or 0xd0 <= marker <= 0xd8: # 길이 없는 마커
+            i += 2
+            continue
+        if marker in (0xd9, 0xda): # 크기 정보 없이 끝/영상 데이터 시작
+            raise ImageRejected(IMAGE_REJECTED)
+        length = int.from_bytes(head[i + 2:i + 4], 'big')
+        if length < 2:
+            raise ImageRejected(IMAGE_REJECTED)
+        if 0xc0 <= marker <= 0xcf and marker not in (0xc4, 0xc8, 0xcc):
+            if i + 9 > len(head):
+                return None
+            h, w = struct.unpack('>HH', head[i + 5:i + 9])
+            return w, h
+        i += 2 + length
+
+def check_image(head):
+    # 파일 앞부분 head(bytes)로 (형식 확장자, 가로, 세로) 반환. 판단하기에 바이트가 모자라면 None
+    # 이미지가 아니거나, 크기가 0이거나, IMAGE_MAX_SIDE/IMAGE_MAX_PIXELS를 넘으면 ImageRejected
+    for signature, kind in _IMAGE_SIGNATURES:
+        if head[:len(signature)] == signature[:len(head)]:
+            if len(head) < len(signature):
+                return None
+            break
+    else:
+        raise ImageRejected(IMAGE_REJECTED)
+    size = _image_size(head, kind)
+    if size is None:
+        if len(head) >= app.config['IMAGE_SNIFF_BYTES']:
+            raise ImageRejected(IMAGE_REJECTED)
+        return None
+    w, h = size
+    if not (w and h):
+        raise ImageRejected(IMAGE_REJECTED)
+    if max(w, h) > app.config['IMAGE_MAX_SIDE'] or w * h > app.config['IMAGE_MAX_PIXELS']:
+        raise ImageRejected(f"이미지가 너무 큽니다 ({w}x{h}). 최대 {app.config['IMAGE_MAX_SIDE']}px, "
+                            f"{app.config['IMAGE_MAX_PIXELS'] // 10_000}만 화소까지 올릴 수 있습니다.")
+    return kind, w, h
+
+# 💜 업로드 스트리밍: multipart 본문의 파일 부분을 UPLOAD_DIR 안의 임시 파일로 바로 흘려 씀
+# - 기본 동작(SpooledTemporaryFile)은 500KB까지 메모리에 모았다가 /tmp로 옮김 -> 여기선 처음부터 디스크에, 조각(chunk) 단위로
+# - 같은 디렉터리라서 save_image는 다시 복사하지 않고 하드링크만 검 (안 되는 파일시스템이면 복사)
+# - 임시 파일은 요청이 끝나면 닫히면서 지워짐 (저장하지 않은 업로드도 남지 않음)
+# - 전체 크기는 MAX_CONTENT_LENGTH(넘으면 413), 파일이 아닌 폼 필드는 MAX_FORM_MEMORY_SIZE로 제한
+# - 받으면서 SHA-256도 같이 계산 (내용 주소 저장: 파일을 다시 읽지 않음)
+# - 앞부분이 들어오는 대로 이미지 검사(check_image). 허용되지 않는 확장자는 본문을 받기도 전에 거절
+class _HashingUpload:
+    # 임시 파일 감싸기: write()로 들어오는 조각마다 해시 갱신 + 형식/크기 확인, 나머지는 임시 파일 그대로
+    def __init__(self):
+        self.file = tempfile.NamedTemporaryFile('w+b', dir=UPLOAD_DIR, prefix='.upload-', suffix='.part')
+        self.sha256 = hashlib.sha256()
+        self.image_info = None # check_image 결과 (형식, 가로, 세로). 끝까지 None이면 이미지가 아님
+        self._head = b''
+
+    def write(self, data):
+        if self.image_info is None and data:
+            self._head += data
+            try:
+                self.image_info = check_image(self._head)
+            except ImageRejected:
+                self.file.close() # 지금까지 받은 부분도 바로 삭제
+                raise
+            if self.image_info is not None:
+                self._head = b''
+        self.sha256.update(data)
+        return self.file.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self.file, name)
+
+class UploadRequest(Request):
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if filename and not allowed_file(filename):
+            raise ImageRejected(IMAGE_REJECTED)
+        return _HashingUpload()
+
+app.request_class = UploadRequest
+
+# 💜 내용 주소 저장: 업로드 파일 이름 = 내용의 SHA-256 + 확장자
+# - 같은 사진을 여러 번 올려도 파일은 하나 (이미 있으면 새로 쓰지 않고 그 경로를 그대로 사용)
+# - 몇 개의 글이 그 파일을 쓰는지는 저장소가 셈 (PostStore.image_refs)
+#   글을 지우거나 이미지를 바꿔서 아무 글도 안 쓰게 되면 원본과 썸네일을 지움 (collect_image)
+# - 파일 연결 ~ 글 저장, 참조 확인 ~ 파일 삭제는 모두 쓰기 락(_write_lock) 안에서
+#   -> 방금 올린 같은 사진을 다른 글 삭제가 지워버리는 경우가 없음
 def save_image(file_storage) -> str | None:
-# 업로드된 파일은 static/uploas에 저장하고
-# static 기준의 상대경로('uploads/파일명')를 반환
-    if not file_storage or file_storage.filename.strip() == "":
+# 업로드된 파일은 static/uploads에 저장하고
+# static 기준의 상대경로('uploads/<sha256>.확장자')를 반환 (쓰기 락 안에서 호출)
+    if not file_storage or not file_storage.filename or file_storage.filename.strip() == "":
         return None
     if not allowed_file(file_storage.filename):
         return None
-    ext = file_storage.filename.rsplit(".", 1)[1].lower()
-    safe_base = secure_filename(file_storage.filename.rsplit(".", 1)[0])["40"] or "img"
-    unique_name = "f{safe_base}-{uuid.uuid4().hex[:0]}.{ext}"
+    stream = file_storage.stream
+    digest = getattr(stream, 'sha256', None)
+    if digest is None: # UploadRequest를 거치지 않은 파일: 한 번 읽어서 검사 + 계산
+        try:
+            info = check_image(stream.read(app.config['IMAGE_SNIFF_BYTES']))
+        except ImageRejected:
+            return None
+        stream.seek(0)
+        digest = hashlib.sha256()
+        for chunk in iter(lambda: stream.read(64 * 1024), b''):
+            digest.update(chunk)
+        stream.seek(0)
+    else:
+        info = stream.image_info
+    if info is None: # 헤더도 다 안 되는 잘린 파일
+        return None
+    ext = info[0] # 파일 이름이 아니라 실제 형식의 확장자
+    unique_name = f"{digest.hexdigest()}.{ext}"
     dest_path = UPLOAD_DIR / unique_name
-    file_storage.save(dest_path)
-    # static 경로 기준으로 저장(템플릿에서 url_for('static', filename=...) 로 접근)
+    if dest_path.exists():
+        return f"uploads/{unique_name}" # 같은 내용의 파일이 이미 있음
+    name = getattr(stream, 'name', None)
+    try:
+        if not isinstance(name, str) or Path(name).parent != UPLOAD_DIR:
+            raise OSError
+        stream.flush()
+        os.link(name, dest_path)
+    except FileExistsError:
+        pass
+    except OSError:
+        tmp = UPLOAD_DIR / f".{unique_name}.tmp"
+        file_storage.save(tmp) # 64KB씩 복사. 다 쓴 뒤에 이름을 붙여서 반쯤 쓴 파일이 보이지 않게
+        os.replace(tmp, dest_path)
+    # static 경로 기준으로 저장(템플릿에서는 upload_url(...) 로 접근)
     return f"uploads/{unique_name}"
 
+def collect_image(store, image):
+    # image를 쓰는 글이 store에 더 없으면 원본과 썸네일 파일 삭제. 지웠으면 True
+    if not image:
+        return False
+    name = Path(image).name
+    with _write_lock:
+        if store.image_refs(image) > 0:
+            return False
+        for path in [UPLOAD_DIR / name, *UPLOAD_DIR.glob(f"{name}.w*")]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+    return True
+
+# 💜 썸네일: 원본을 저장한 뒤 THUMBNAIL_WIDTHS 폭의 축소본을 백그라운드 스레드 풀에서 만듦 (요청은 기다리지 않음)
+# - 형식: WebP (Pillow에 WebP가 없으면 투명도 있는 이미지는 PNG, 아니면 JPEG). 파일 이름: <원본 이름>.w<폭>.<확장자>
+# - 원본보다 좁은 폭만 만듦. 큰 폭부터 만들고 다음 폭은 방금 만든 축소본에서 줄임 (큰 원본을 여러 번 줄이지 않음)
+# - 파일 이름이 내용 해시라서 축소본이 이미 다 있으면(같은 사진을 또 올림) 다시 만들지 않음
+# - 움직이는 GIF는 줄이면 첫 프레임만 남으므로 원본만 기록
+# - 다 만들면 글의 image_variants에 [[폭, 경로], ...] 기록(원본 포함) -> 상세 페이지가 srcset으로 알맞은 크기를 고름
+#   그 사이 글이 지워졌거나 이미지가 바뀌었으면 기록하지 않음. 작업이 유실돼도(재시작 등) 원본은 그대로 보임
+# - 이미 올라온 이미지: flask --app app thumbnails
+app.config.setdefault('THUMBNAIL_WIDTHS', (320, 640, 1280))
+app.config.setdefault('THUMBNAIL_WORKERS', 2)
+app.config.setdefault('THUMBNAIL_QUALITY', 80)
+
+_thumbnails = {'pool': None, 'queued': 0, 'done': 0, 'failed': 0}
+_thumbnails_lock = threading.Lock()
+
+def make_thumbnails(image):
+    # 축소본을 만들고 [[폭, 경로], ...] (폭 오름차순, 마지막은 원본) 반환. Pillow가 없으면 []
+    if Image is None or not image:
+        return []
+    src = UPLOAD_DIR / Path(image).name
+    with Image.open(src) as img:
+        if getattr(img, 'is_animated', False):
+            return [[img.width, image]]
+        orientation = img.getexif().get(0x0112, 1) # 휴대폰 사진의 회전 정보 (5~8은 가로/세로가 바뀜)
+        width, height = img.size if orientation < 5 else img.size[::-1]
+        alpha = img.mode in ('RGBA', 'LA', 'PA') or 'transparency' in img.info
+        if features.check('webp'):
+            fmt, ext = 'WEBP', 'webp'
+        else:
+            fmt, ext = ('PNG', 'png') if alpha else ('JPEG', 'jpg')
+        widths = sorted((w for w in set(app.config['THUMBNAIL_WIDTHS']) if w < width), reverse=True)
+        names = [f"{src.name}.w{w}.{ext}" for w in widths]
+        if not all((UPLOAD_DIR / name).exists() for name in names):
+            img = ImageOps.exif_transpose(img).convert('RGBA' if alpha else 'RGB')
+            for w, name in zip(widths, names):
+                img = img.resize((w, max(round(height * w / width), 1)), Image.Resampling.LANCZOS, reducing_gap=3.0)
+                tmp = UPLOAD_DIR / f".{name}.{os.getpid()}.{threading.get_ident()}.tmp" # 같은 사진의 작업이 겹쳐도 안전
+                img.save(tmp, fmt, quality=app.config['THUMBNAIL_QUALITY'])
+                os.replace(tmp, UPLOAD_DIR / name)
+    return [[w, f"uploads/{name}"] for w, name in zip(widths[::-1], names[::-1])] + [[width, image]]
+
+def _thumbnail_job(post_id, image):
+    try:
+        store = get_store()
+        variants = make_thumbnails(image)
+        if variants and store.set_image_variants(post_id, image, variants):
+            _invalidate_pages(post_id)
+        else:
+            collect_image(store, image) # 만드는 사이 글이 지워졌으면 방금 만든 축소본도 정리
+    except Exception:
+        app.logger.exception("thumbnail generation failed: %s", image)
+        with _thumbnails_lock:
+            _thumbnails['failed'] += 1
+    else:
+        with _thumbnails_lock:
+            _thumbnails['done'] += 1
+
+def schedule_thumbnails(post_id, image):
+    # 썸네일 작업을 풀에 넘기고 Future 반환 (Pillow가 없거나 이미지가 없으면 None)
+    if Image is None or not image:
+        return None
+    with _thumbnails_lock:
+        if _thumbnails['pool'] is None:
+            _thumbnails['pool'] = ThreadPoolExecutor(app.config['THUMBNAIL_WORKERS'], thread_name_prefix='thumbnails')
+        _thumbnails['queued'] += 1
+        return _thumbnails['pool'].submit(_thumbnail_job, post_id, image)
+
+def thumbnail_stats():
+    with _thumbnails_lock:
+        return {'enabled': Image is not None, 'queued': _thumbnails['queued'],
+                'done': _thumbnails['done'], 'failed': _thumbnails['failed']}
+
+def image_srcsets(post):
+    # 상세 페이지 <picture>용 srcset: {'webp': 'url 320w, ...', 'img': '...'} (축소본이 없으면 빈 dict)
+    # WebP 축소본은 <source type="image/webp">로, 나머지(원본 포함)는 <img srcset>으로
+    if len(post.image_variants) < 2:
+        return {}
+    groups = {}
+    for width, path in post.image_variants:
+        kind = 'webp' if path.endswith('.webp') and path != post.image else 'img'
+        groups.setdefault(kind, []).append(f"{upload_url(path)} {width}w")
+    return {kind: ', '.join(items) for kind, items in groups.items()}
+
+@app.cli.command('thumbnails')
+def thumbnails_command():
+    """썸네일이 없는 이미지 글의 축소본을 만든다 (THUMBNAIL_WORKERS개 스레드)."""
+    if Image is None:
+        print("Pillow is not installed (pip install Pillow)")
+        return
+    store = get_store()
+    jobs = [schedule_thumbnails(p.id, p.image) for p in store.iter_posts() if p.image and not p.image_variants]
+    for job in jobs:
+        job.result()
+    stats = thumbnail_stats()
+    print(f"thumbnails: {stats['done']} done, {stats['failed']} failed")
+
 
 
 # 글을 저장할 파일 경로
 FILE_PATH = 'posts.txt'
 
+# 💜 JSON 코덱: 줄을 읽을 때(글/저널/요약) orjson이 있으면 orjson.loads, 없으면 json.loads
+# - orjson.JSONDecodeError는 json.JSONDecodeError의 하위 클래스라 except 절은 그대로
+# - 쓰기는 항상 json.dumps: 설치 여부가 다른 워커가 같은 파일에 써도 줄 형식(구분자 공백 등)이 같아야 함
+#   (필드 선택 파싱의 _HEAD_END 표시도 이 형식 기준)
+# - 줄은 bytes로 넘김: orjson은 bytes를 바로 읽고, json.loads는 bytes면 인코딩 감지를 매번 하므로 먼저 decode
+if orjson is not None:
+    _json_loads = orjson.loads
+else:
+    def _json_loads(data):
+        return json.loads(data.decode('utf-8') if isinstance(data, bytes) else data)
+
+# 💜 글/댓글 객체: 줄마다 dict를 두 번(파싱 결과 + 정규화 결과) 만들지 않고 파싱 결과에서 바로 생성
+# - __slots__: 인스턴스마다 __dict__(키 해시 테이블)가 없어서 캐시에 글/댓글이 많아도 메모리가 적음
+#   (flask --app app bench-memory 로 dict와 비교)
+# - 두 저장소(jsonl/sqlite) 모두 글은 Post, 댓글은 Comment로 돌려줌. 코드에서는 post.title 처럼 속성으로 접근
+# - 템플릿은 그대로: Jinja의 post.title / post['title'] 모두 동작
+#   (dict식 접근 post['title'], post.get('image'), {**post}도 예전 코드 호환용으로 남겨 둠)
+class _Record:
+    __slots__ = ()
+
+    def __getitem__(self, name):
+        try:
+            return getattr(self, name)
+        except AttributeError:
+            raise KeyError(name) from None
+
+    def __setitem__(self, name, value):
+        setattr(self, name, value)
+
+    def __contains__(self, name):
+        return name in self.__slots__
+
+    def get(self, name, default=None):
+        return getattr(self, name, default)
+
+    def keys(self):
+        return self.__slots__
+
+    def __repr__(self):
+        return f"{type(self).__name__}({', '.join(f'{k}={self[k]!r}' for k in self.__slots__)})"
+
+class Comment(_Record):
+    __slots__ = ('text', 'created_at')
+
+    def __init__(self, text, created_at=''):
+        self.text = text
+        self.created_at = created_at
+
+class Post(_Record):
+    __slots__ = ('id', 'title', 'content', 'image', 'created_at', 'comments', 'image_variants', 'edited_at')
+
+    def __init__(self, id, title='', content='', image='', created_at='', comments=None, image_variants=None,
+                 edited_at=''):
+        self.id = id
+        self.title = title
+        self.content = content
+        self.image = image
+        self.created_at = created_at
+        self.comments = [] if comments is None else comments
+        # [[폭, static 기준 경로], ...] 폭 오름차순, 마지막은 원본 (썸네일 참고). 아직 없으면 ()
+        # 통째로 바꾸기만 하고 고치지 않으므로 빈 값은 글마다 리스트를 만들지 않고 빈 튜플 하나를 같이 씀
+        self.image_variants = image_variants or ()
+        self.edited_at = edited_at # 마지막 수정 시각 (수정한 적 없으면 ''). 목록의 "마지막 활동"에 들어감
+
 # 💜 파일 I/O 유틸(JSON Lines)
-def _normalize_post(obj):
-    # JSON/구형라인을 표준 포맷으로 변환
-    title = obj.get('title', '')
-    content = obj.get('content', '')
-    image = obj.get('image', "") # <- 새로 추가: 이미지 경로(없으면 빈 문자열)
+def _normalize_post(obj, fallback_id=None):
+    # JSON/구형라인을 표준 포맷(Post)으로 변환
+    # - id: 글의 고유 번호(삭제돼도 다른 글 번호가 바뀌지 않음). id가 없는 옛 기록은 fallback_id를 부여
+    #   (다음 compaction 때 파일에 기록되므로 점진적으로 마이그레이션됨)
+    post_id = obj.get('id')
+    if not isinstance(post_id, int):
+        post_id = fallback_id
     # comments는 선택적. 없으면 빈 리스트.
-    comments = obj.get('comments',[])
-    # 댓글 항목은 dict(text, create_at) 형태로 정규화
+    # 댓글 항목은 Comment(text, created_at) 형태로 정규화 (예전 기록은 문자열)
     norm_comments = []
-    for c in comments:
+    for c in obj.get('comments', []):
         if isinstance(c, dict) and 'text' in c:
-            norm_comments.append({
-                'text': c['text'],
-                'created_at': c.get('created_at', '')
-            })
+            norm_comments.append(Comment(c['text'], c.get('created_at', '')))
         elif isinstance(c, str):
-            norm_comments.append({'text': c, 'created_at': ''})
-    return{'title': title, 'content': content, 'image': image, 'comments': norm_comments}
+            norm_comments.append(Comment(c))
+    # image: 이미지 경로(없으면 빈 문자열) / created_at: 글 작성 시각 (예전 글은 빈 문자열)
+    return Post(post_id, obj.get('title', ''), obj.get('content', ''), obj.get('image', ""),
+                obj.get('created_at', ''), norm_comments, obj.get('image_variants'), obj.get('edited_at', ''))
+
+# 💜 읽기 캐시: 저널을 접은 결과(_journal_view)만 프로세스 전역에 보관
+# - 저널/posts.txt stat(mtime_ns, size, inode)이 바뀌었거나, 앱이 직접 저장했을 때만 다시 만든다
+# - 글 목록 전체는 캐시하지 않음: 읽기는 모두 iter_posts()/인덱스로 필요한 줄만 읽음
+#   (예전의 전체 목록 캐시는 iter_posts로 바뀐 뒤 채우는 곳이 없어서 제거)
+# - hits / misses 카운터는 /metrics 에서 확인 (posts_cache)
+_posts_cache = {'journal_key': None, 'journal': None, 'hits': 0, 'misses': 0}
+_posts_cache_lock = threading.Lock()
+
+def _file_key(path):
+    # 파일이 바뀌었는지 판단하는 값. 파일이 없으면 None
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+def _invalidate_posts_cache():
+    # 앱이 직접 파일을 쓴 뒤 호출 (mtime 해상도가 낮은 파일시스템 대비)
+    with _posts_cache_lock:
+        _posts_cache.update(journal_key=None, journal=None)
+
+def _copy_post(post):
+    # 글에 저널을 적용하기 전에 복사 (댓글 리스트까지)
+    return Post(post.id, post.title, post.content, post.image, post.created_at,
+                [Comment(c.text, c.created_at) for c in post.comments], post.image_variants, post.edited_at)
+
+def cache_stats():
+    with _posts_cache_lock:
+        return {'hits': _posts_cache['hits'], 'misses': _posts_cache['misses']}
 
 # 💜함수: 글 목록 불러오기(제목 + 내용)
 def load_posts():
-    # post.txt를 한 줄씩 읽어서 JSON으로 파싱해서 [{'title':..., 'content':...},...] 형태로 반환
-    # 📌 하위호환: 
-    # - 과거 사용하였던 '제목|||내용' 형식의 라인도 자동 인식하여 comments=[], image=""로 읽어옴
-    # - 이후 수정/삭제/새 글 작성 시엔 JSONL로 저장됨.
+    # 전체 글 리스트 (저널 반영). 한 번에 다 필요한 곳(검색 비교 벤치마크 등)만 사용
+    # 화면/목록은 iter_posts()나 요약을 씀 -> 파일 전체를 메모리에 올리지 않음
+    return list(iter_posts())
+
+def _snapshot_key():
+    # posts.txt + 저널 상태. 읽기 전후로 비교해서 중간에 바뀌었는지 확인하는 용도
+    return (_file_key(FILE_PATH), _file_key(_journal_path()))
+
+def _parse_line(raw, fallback_id=None, legacy=True):
+    # 한 줄(bytes)을 Post로 변환. 빈 줄/알 수 없는 줄이면 None
+    # bytes 그대로 디코더에 넘김 (str로 바꿨다가 orjson이 다시 UTF-8로 바꾸는 일이 없도록)
+    # legacy=False: 마이그레이션된 파일. JSON이 아니면 구형 포맷으로 다시 해석하지 않고 바로 None
+    line = raw.strip()
+    if not line:
+        return None
+
+    # 1) 우선 JSONL 시도 (깨진 UTF-8 바이트가 섞인 줄은 대체 문자로 바꿔서 한 번 더)
+    text = None
+    try:
+        obj = _json_loads(line)
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        if not legacy:
+            return None
+        text = line.decode('utf-8', errors='replace')
+        try:
+            obj = json.loads(text)
+        except json.JSONDecodeError:
+            obj = None
+    if isinstance(obj, dict):
+        return _normalize_post(obj, fallback_id)
+
+    # 2) 구형 '제목|||내용' 포멧 (처음 구분자만 분리)
+    parts = text.split('|||', 1) if text is not None else []
+    if len(parts) == 2:
+        title, content = parts
+        return Post(fallback_id, title, content)
+    return None
+
+# 💜 형식 헤더: 마이그레이션(flask --app app migrate)이나 compaction으로 다시 쓴 posts.txt의 첫 줄
+# - {"op": "header", "format": 2} -> 모든 줄이 JSONL. 읽을 때 구형 '제목|||내용' 처리(실패한 JSON 파싱 + 예외)를 건너뜀
+# - 헤더가 없으면 format 1(구형 줄이 섞여 있을 수 있음)로 보고 예전처럼 읽음
+# - 헤더 줄은 글이 아님: 인덱스/글 수/목록에 들어가지 않음 (읽는 쪽은 _skip_format_header()로 건너뜀)
+# - gen: 파일을 새로 쓸 때마다 바뀌는 값. inode는 compaction을 몇 번 거치면 재사용될 수 있어서
+#   "같은 posts.txt인지"를 (inode, gen)으로 판단할 때 사용 (검색 색인, id 맵, 요약/참조 수 파일)
+_POSTS_FORMAT = 2
+
+def _format_header():
+    return json.dumps({'op': 'header', 'format': _POSTS_FORMAT, 'gen': uuid.uuid4().hex}).encode('utf-8')
+
+def _posts_identity():
+    # 지금 posts.txt가 어떤 파일인지: (inode, 형식 헤더의 gen). 파일이 없으면 None
+    # 형식 헤더가 없는 구형 파일은 gen이 None (다시 쓰면 항상 헤더가 붙으므로 같은 값이 다시 나오지 않음)
+    base = _posts_base()
+    return None if base is None else _identity_of(*base)
+
+def _identity_of(ino, first):
+    # (inode, 첫 줄) -> (inode, gen)
+    gen = None
+    if first.startswith(b'{"op": "header"'):
+        try:
+            gen = _json_loads(first).get('gen')
+        except json.JSONDecodeError:
+            pass
+    return ino, gen
+
+def _base_header():
+    # 저널/요약/참조 수 파일의 첫 줄: 이 파일이 어떤 posts.txt 기준인지 (쓰기 락 안에서 호출)
+    ino, gen = _posts_identity()
+    return json.dumps({'op': 'header', 'base_ino': ino, 'base_gen': gen}).encode('utf-8')
+
+def _header_base(header):
+    # _base_header()로 쓴 줄 -> (inode, gen). 헤더가 아니면 None
+    try:
+        obj = _json_loads(header)
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(obj, dict) or obj.get('op') != 'header':
+        return None
+    return obj.get('base_ino'), obj.get('base_gen')
+
+def _skip_format_header(f):
+    # 파일(바이너리, 맨 앞) 첫 줄이 형식 헤더면 건너뛰고 False, 아니면 제자리에 두고 True (= 구형 줄 처리 필요)
+    first = f.readline()
+    if first.startswith(b'{"op": "header"'):
+        try:
+            return _json_loads(first).get('format', 1) < _POSTS_FORMAT
+        except json.JSONDecodeError:
+            pass
+    f.seek(0)
+    return True
+
+# 💜 필드 선택 파싱: 목록/요약처럼 가벼운 필드만 필요할 땐 줄 앞부분만 디코딩
+# - 글은 가벼운 필드(id, title, created_at, comment_count, last_activity, image)를 먼저, 무거운 필드(content, comments)를 뒤에 기록
+#   comment_count/last_activity는 댓글에서 계산되는 값을 미리 적어둔 것 (저널이 적용되는 글은 전체를 파싱해서 다시 계산)
+# - 줄에서 "content" 키 앞까지만 잘라서 디코딩 -> 본문/댓글 문자열은 디코딩하지 않음
+# - 앞부분에 필요한 키가 없으면(예전에 쓴 줄, 구형 '제목|||내용') 줄 전체를 파싱 (다음 compaction 때 새 순서로 다시 씀)
+#   단, image는 이미지 기능 전에 쓴 줄엔 아예 없는 키라 뒷부분에도 없으면 ''(이미지 없음)로 봄 -> 이미지 참조 수를 다시 셀 때도 앞부분만 디코딩
+# - 디코딩한 바이트 수는 /metrics 의 decode 에서 확인 (flask --app app bench-listing 으로 비교)
+_HEAD_FIELDS = ('id', 'title', 'created_at', 'comment_count', 'last_activity', 'image')
+_HEAD_DEFAULTS = {'image': ''} # 앞부분에 없어도 되는 키와 그 기본값
+_SUMMARY_FIELDS = ('id', 'title', 'comment_count', 'last_activity')
+_HEAD_END = b', "content": ' # json.dumps 기본 구분자 기준. 가벼운 필드는 이 앞에 있음
+_decode_stats = {'bytes_read': 0, 'bytes_decoded': 0}
+_decode_stats_lock = threading.Lock()
+
+def _count_decoded(read, decoded):
+    with _decode_stats_lock:
+        _decode_stats['bytes_read'] += read
+        _decode_stats['bytes_decoded'] += decoded
+
+def decode_stats():
+    with _decode_stats_lock:
+        return dict(_decode_stats)
+
+def _parse_head(raw, wanted):
+    # raw(bytes) 한 줄에서 "content" 키 앞부분만 잘라 JSON으로 파싱. wanted 키가 다 없으면 None (-> 전체 파싱)
+    # 앞쪽 필드는 숫자/문자열뿐이고 JSON 문자열 안의 따옴표는 \" 로 기록되므로 처음 찾은 표시가 진짜 키
+    end = raw.find(_HEAD_END)
+    if end < 0:
+        return None
     try:
-        #파일을 읽고 줄마다 리스트로 만들어서 반환
-        posts = []
-        with open(FILE_PATH, 'r', encoding='utf-8') as f:
+        head = _json_loads(raw[:end] + b'}')
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        return None
+    if not isinstance(head, dict) or not isinstance(head.get('id'), int):
+        return None
+    for k in wanted:
+        if k not in head:
+            # 뒷부분은 디코딩 없이 바이트로 키만 찾음 (문자열 안의 따옴표는 \" 라서 본문에 걸리지 않음)
+            if k not in _HEAD_DEFAULTS or b'"%s": ' % k.encode() in raw[end:]:
+                return None
+            head[k] = _HEAD_DEFAULTS[k]
+    _count_decoded(0, end) # 앞부분만으로 끝난 경우만 (None이면 호출한 쪽이 줄 전체를 파싱하면서 셈)
+    return head
+
+# 💜 오프셋 인덱스(posts.txt.idx): N번째 글이 파일의 몇 번째 바이트에 있는지 기록
+# - 상세보기/수정 화면은 인덱스로 바로 seek 해서 JSON 한 줄만 읽는다 (전체 파일 파싱 X)
+# - 구조: [헤더: 매직, posts.txt 크기, mtime_ns, inode, 다음 글 id] + [글마다 (offset, length, id)] 고정 길이 레코드
+# - 헤더의 stat이 실제 posts.txt와 다르면(외부 수정 등) 오래된 인덱스로 보고 전체 재생성
+# - "다음 글 id"는 지금까지 쓴 가장 큰 id + 1. 마지막 글이 지워져도 id를 재사용하지 않기 위해 따로 보관
+_IDX_HEADER = struct.Struct('<4sQQQQ')
+_IDX_ENTRY = struct.Struct('<QIQ')
+_IDX_MAGIC = b'PID2'
+
+def _index_path():
+    return f"{FILE_PATH}.idx"
+
+def _index_header(key, next_id):
+    return _IDX_HEADER.pack(_IDX_MAGIC, key[1], key[0], key[2], next_id)
+
+def _index_is_fresh(f, key):
+    # 인덱스 헤더가 현재 posts.txt stat과 같으면 "다음 글 id"를, 아니면 None
+    head = f.read(_IDX_HEADER.size)
+    if len(head) != _IDX_HEADER.size or key is None:
+        return None
+    magic, size, mtime_ns, ino, next_id = _IDX_HEADER.unpack(head)
+    if magic == _IDX_MAGIC and (mtime_ns, size, ino) == key:
+        return next_id
+    return None
+
+def _write_index(entries, key, next_id):
+    # 인덱스 전체를 새로 씀 (임시 파일에 쓰고 교체)
+    # 요청 스레드(재생성)와 compaction이 동시에 쓸 수 있으므로 임시 파일 이름은 매번 다르게
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(_index_path())), suffix='.idx.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(_index_header(key, next_id))
+        for entry in entries:
+            f.write(_IDX_ENTRY.pack(*entry))
+    os.replace(tmp, _index_path())
+
+def _rebuild_index():
+    # posts.txt를 처음부터 훑어서 인덱스 재생성 (인덱스가 없거나 오래됐을 때만)
+    # - 쓰기 락 안에서: 락 없이 읽는 쪽이 재생성하면, 그 사이 추가된 글이 재생성 결과에도 들어가고
+    #   쓰는 쪽의 _append_index도 "최신" 헤더를 보고 같은 글을 한 번 더 붙임 (같은 id가 두 위치에)
+    # - 락을 잡은 뒤 다시 확인: 기다리는 동안 다른 스레드/프로세스가 이미 만들었으면 그대로 씀
+    with _write_lock:
+        key = _file_key(FILE_PATH)
+        if key is None:
+            return
+        next_id = 1
+        try:
+            # 오래된 인덱스라도 "다음 글 id"는 살려서 id 재사용을 막음
+            with open(_index_path(), 'rb') as f:
+                if _index_is_fresh(f, key):
+                    return
+                f.seek(0)
+                head = f.read(_IDX_HEADER.size)
+            if len(head) == _IDX_HEADER.size and head[:4] == _IDX_MAGIC:
+                next_id = _IDX_HEADER.unpack(head)[4]
+        except FileNotFoundError:
+            pass
+        entries = []
+        last_id = 0
+        with open(FILE_PATH, 'rb') as f:
+            legacy = _skip_format_header(f)
+            offset = f.tell()
             for raw in f:
-                line = raw.strip()
-                if not line:
-                    continue
+                line = raw.rstrip(b'\r\n')
+                post = _parse_line(line, last_id + 1, legacy)
+                if post is not None:
+                    entries.append((offset, len(line), post.id))
+                    last_id = post.id
+                offset += len(raw)
+        _write_index(entries, key, max(next_id, last_id + 1))
 
-                # 1) 우선 JSONL 시도
-                try:
-                    obj = json.loads(line)
-                    if isinstance(obj, dict):
-                        posts.append(_normalize_post(obj))
+def _read_index(reader):
+    # 최신 인덱스 파일을 열어 reader(f)를 호출. 인덱스가 없거나 오래됐으면 한 번 재생성 후 다시 시도
+    key = _file_key(FILE_PATH)
+    if key is None:
+        return None
+    for attempt in range(2):
+        try:
+            with open(_index_path(), 'rb') as f:
+                if _index_is_fresh(f, key):
+                    return reader(f)
+        except FileNotFoundError:
+            pass
+        if attempt == 0:
+            _rebuild_index()
+            key = _file_key(FILE_PATH)
+    return None
+
+def _index_entries(start, count):
+    # start번째부터 count개 글의 [(offset, length, id), ...] (파일 끝이면 더 적게)
+    if start < 0 or count <= 0:
+        return []
+    def reader(f):
+        f.seek(_IDX_HEADER.size + start * _IDX_ENTRY.size)
+        data = f.read(count * _IDX_ENTRY.size)
+        usable = len(data) - len(data) % _IDX_ENTRY.size
+        return list(_IDX_ENTRY.iter_unpack(data[:usable]))
+    return _read_index(reader) or []
+
+def _index_entry(index):
+    # index번째 글의 (offset, length, id). 없으면 None
+    entries = _index_entries(index, 1)
+    return entries[0] if entries else None
+
+def _next_post_id():
+    # 새 글에 줄 id (인덱스 헤더에 보관된 값)
+    def reader(f):
+        f.seek(0)
+        return _IDX_HEADER.unpack(f.read(_IDX_HEADER.size))[4]
+    return _read_index(reader) or 1
+
+# 💜 id -> posts.txt 위치 맵 (메모리): id로 글을 찾을 때 O(1)
+# - 인덱스 파일에서 만들고, 같은 인덱스 파일에 글이 덧붙기만 했으면 늘어난 뒤쪽만 읽어서 추가
+# - 인덱스가 새로 만들어지면(compaction/재생성) 처음부터 다시 만듦
+#   "같은 인덱스인지"는 (인덱스 inode, posts.txt의 (inode, 첫 줄)): inode만으로는 compaction을 두 번 거치면
+#   재사용될 수 있음 -> 다시 쓴 posts.txt마다 다른 형식 헤더의 gen으로 구분 (검색 색인과 같은 방식)
+_id_map = {'key': None, 'ids': [], 'pos': {}}
+_id_map_lock = threading.Lock()
+
+def _id_positions():
+    # (위치별 id 리스트, {id: 위치}) 반환. 읽기 전용으로 사용
+    def reader(f):
+        st = os.fstat(f.fileno())
+        count = (st.st_size - _IDX_HEADER.size) // _IDX_ENTRY.size
+        f.seek(0)
+        data_ino = _IDX_HEADER.unpack(f.read(_IDX_HEADER.size))[3]
+        base = _posts_base()
+        # 인덱스 헤더의 posts.txt inode와 지금 연 posts.txt가 다르면(그 사이 교체) 이번 결과는 재사용하지 않음
+        key = (st.st_ino, base) if base is not None and base[0] == data_ino else None
+        with _id_map_lock:
+            if key is not None and _id_map['key'] == key and len(_id_map['ids']) <= count:
+                ids, pos = _id_map['ids'], _id_map['pos']
+            else:
+                ids, pos = [], {}
+            done = len(ids)
+            if done < count:
+                f.seek(_IDX_HEADER.size + done * _IDX_ENTRY.size)
+                data = f.read((count - done) * _IDX_ENTRY.size)
+                ids = ids + [e[2] for e in _IDX_ENTRY.iter_unpack(data)]
+                pos = dict(pos)
+                pos.update((post_id, i) for i, post_id in enumerate(ids[done:], done))
+            _id_map.update(key=key, ids=ids, pos=pos)
+            return ids, pos
+    return _read_index(reader) or ([], {})
+
+# 💜함수: 글 한 건만 불러오기 (상세보기/수정 화면용)
+def load_post(post_id):
+    # id -> posts.txt 위치(맵) -> 인덱스의 바이트 위치 -> 그 줄만 읽음
+    for _ in range(3):
+        key = _snapshot_key()
+        view = _journal_view()
+        pos = _id_positions()[1].get(post_id)
+        post = None
+        if pos is not None and pos not in view['deleted_set']:
+            post = _read_post_at(pos, view, post_id)
+        if _snapshot_key() == key:
+            break # 읽는 도중 compaction이 끼어들지 않았음
+    return post
+
+def _read_post_at(pos, view, post_id):
+    # 인덱스의 pos번째 줄이 post_id 글일 때만 읽음 (맵과 인덱스가 어긋났으면 다른 글 대신 None)
+    entry = _index_entry(pos)
+    if entry is None or entry[2] != post_id:
+        return None
+    offset, length, _ = entry
+    try:
+        with open(FILE_PATH, 'rb') as f:
+            f.seek(offset)
+            line = f.read(length)
+    except FileNotFoundError:
+        return None
+    post = _parse_line(line, post_id)
+    if post is not None and pos in view['ops']:
+        post = _apply_ops(post, view['ops'][pos])
+    return post
+
+def load_posts_by_id(post_ids):
+    # 여러 글을 한 번에 {id: 글}. 위치 순서로 정렬해서 인덱스/posts.txt를 한 번씩만 열고 읽음 (없는 글은 빠짐)
+    for _ in range(3):
+        key = _snapshot_key()
+        view = _journal_view()
+        positions = _id_positions()[1]
+        wanted = sorted((positions[i], i) for i in post_ids
+                        if i in positions and positions[i] not in view['deleted_set'])
+        def reader(idx):
+            found = {}
+            with open(FILE_PATH, 'rb') as f:
+                for pos, post_id in wanted:
+                    idx.seek(_IDX_HEADER.size + pos * _IDX_ENTRY.size)
+                    data = idx.read(_IDX_ENTRY.size)
+                    if len(data) < _IDX_ENTRY.size:
+                        break
+                    offset, length, entry_id = _IDX_ENTRY.unpack(data)
+                    if entry_id != post_id:
+                        continue # 맵과 인덱스가 어긋남 -> 다른 글 대신 건너뜀
+                    f.seek(offset)
+                    post = _parse_line(f.read(length), post_id)
+                    if post is not None and pos in view['ops']:
+                        post = _apply_ops(post, view['ops'][pos])
+                    if post is not None:
+                        found[post_id] = post
+            return found
+        try:
+            found = (_read_index(reader) if wanted else None) or {}
+        except FileNotFoundError:
+            found = {}
+        if _snapshot_key() == key:
+            break # 읽는 도중 compaction이 끼어들지 않았음
+    return found
+
+# 💜함수: 글을 하나씩 꺼내는 제너레이터 (iter_posts)
+# - load_posts()처럼 전체 리스트를 만들지 않음 -> 파일이 아무리 커도 메모리는 글 한 건 분량
+# - start/limit: 화면상의 start번째부터 limit개. 인덱스로 start 위치까지 바로 seek
+# - fields: ('id', 'title') 처럼 필요한 필드만 담아서 내보냄 (None이면 전체)
+#   _HEAD_FIELDS 안의 필드만 고르면 줄 앞부분만 디코딩 (위의 필드 선택 파싱)
+def iter_posts(start=0, limit=None, fields=None):
+    if start < 0 or (limit is not None and limit <= 0):
+        return
+    yield from _iter_base(lambda view: _resolve_index(start, view['deleted']), limit, fields)
+
+def list_posts(start, limit):
+    # 화면상의 start번째부터 limit개 글 목록
+    return list(iter_posts(start, limit))
+
+def list_posts_after(post_id, limit):
+    # 커서 방식: id가 post_id 보다 큰 글부터 limit개 (id는 파일 순서대로 증가)
+    if limit <= 0:
+        return []
+    return list(_iter_base(lambda view: bisect.bisect_right(_id_positions()[0], post_id), limit))
+
+def _project(post, fields):
+    # comment_count/last_activity 처럼 글에 없는 요약 필드는 댓글로부터 계산
+    if fields is None:
+        return post
+    summary = None
+    projected = {}
+    for name in fields:
+        if name not in post:
+            summary = summary or _summary_of(post)
+            projected[name] = summary[name]
+        else:
+            projected[name] = post[name]
+    return projected
+
+def _iter_base(find_first, limit=None, fields=None):
+    # posts.txt 의 find_first(저널 view) 위치부터 한 줄씩 읽으며 (삭제된 글은 건너뛰고) 저널을 적용해서 내보냄
+    for _ in range(3):
+        view = _journal_view()
+        first = find_first(view)
+        entry = _index_entry(first)
+        if entry is None:
+            return
+        try:
+            f = open(FILE_PATH, 'rb')
+        except FileNotFoundError:
+            return
+        with f:
+            # 저널/인덱스가 지금 연 파일과 같은 posts.txt 기준인지 확인 (사이에 compaction이 끼면 다시)
+            ino = os.fstat(f.fileno()).st_ino
+            base = _identity_of(ino, f.readline())
+            f.seek(0)
+            current = _file_key(FILE_PATH)
+            if view['base'] != base or current is None or current[2] != ino:
+                continue
+            legacy = _skip_format_header(f)
+            f.seek(entry[0])
+            pos, last_id, count, read = first, entry[2] - 1, 0, 0
+            light = fields is not None and set(fields) <= set(_HEAD_FIELDS)
+            try:
+                for raw in f:
+                    read += len(raw)
+                    post = None
+                    if pos in view['deleted_set']:
+                        post = _parse_head(raw, ('id',)) # 건너뛸 글은 id만
+                    elif light and pos not in view['ops']:
+                        post = _parse_head(raw, set(fields) | {'id'})
+                    if post is None:
+                        _count_decoded(0, len(raw))
+                        post = _parse_line(raw, last_id + 1, legacy)
+                        if post is None:
+                            continue
+                    last_id = post['id']
+                    pos += 1
+                    if pos - 1 in view['deleted_set']:
                         continue
+                    if pos - 1 in view['ops']:
+                        post = _apply_ops(post, view['ops'][pos - 1])
+                    yield _project(post, fields)
+                    count += 1
+                    if limit is not None and count >= limit:
+                        return
+                return
+            finally:
+                _count_decoded(read, 0)
+    # 계속 compaction과 엇갈리면 빈 결과로 끝내지 않음 (compaction이 잘린 목록으로 파일을 덮어쓰면 안 되니까)
+    raise RuntimeError('posts.txt가 읽는 도중 계속 교체되었습니다')
+
+# 💜 변경 저널(posts.txt.journal): 댓글 추가/삭제, 글 수정/삭제를 "한 줄 추가"로만 기록
+# - 예전처럼 load_posts() + save_all_posts()로 파일 전체를 다시 쓰지 않음 (O(1) 쓰기)
+# - 읽을 때 posts.txt 위에 저널을 순서대로 덮어써서(fold) 최신 상태를 만든다
+# - 쌓인 저널/삭제된 줄은 백그라운드 compaction(아래)이 posts.txt로 합친다
+# - 이벤트는 글 id로 대상을 가리킴 (id -> posts.txt 위치는 _id_positions() 맵으로 변환)
+# - 첫 줄은 헤더 {"op": "header", "base_ino": ..., "base_gen": ...}: 이 저널이 적용될 posts.txt의 (inode, gen)
+#   compaction은 posts.txt를 새 gen으로 다시 쓰므로, 교체 직후 죽어서 저널이 남아도 두 번 적용되지 않음
+#   (inode만 보면 compaction을 몇 번 거친 뒤 같은 inode가 돌아왔을 때 옛 저널이 다시 적용됨)
+
+# 💜 쓰기 락: 모든 쓰기(글 추가, 저널 추가, compaction)는 이 락 안에서
+# - 같은 프로세스의 스레드끼리는 RLock, 여러 gunicorn 워커(프로세스)끼리는 posts.txt.lock 파일에 flock
+# - flock은 "열린 파일"마다 걸리므로 fork 후 공유되지 않도록 락을 잡을 때마다 파일을 새로 연다
+# - 윈도우처럼 fcntl이 없는 환경에서는 스레드 락만 사용 (프로세스 1개로 실행할 것)
+class _WriteLock:
+    def __init__(self):
+        self._rlock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+
+    def __enter__(self):
+        self._rlock.acquire()
+        if self._depth == 0:
+            try:
+                fd = os.open(f"{FILE_PATH}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+            except BaseException:
+                self._rlock.release()
+                raise
+            self._fd = fd
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc):
+        self._depth -= 1
+        if self._depth == 0:
+            os.close(self._fd) # 닫으면 flock도 풀림
+            self._fd = None
+        self._rlock.release()
+
+_write_lock = _WriteLock()
+
+def _append_line(path, line):
+    # 파일 끝에 한 줄 추가하고 그 줄의 시작 오프셋 반환 (쓰기 락 안에서 호출)
+    # 이전 프로세스가 쓰다가 죽어서 마지막 줄이 \n 없이 끝났으면, 새 줄이 거기에 붙지 않도록 줄바꿈부터
+    with open(path, 'ab') as f:
+        offset = f.seek(0, os.SEEK_END)
+        if offset > 0:
+            with open(path, 'rb') as r:
+                r.seek(offset - 1)
+                if r.read(1) != b'\n':
+                    f.write(b'\n')
+                    offset += 1
+        f.write(line + b'\n')
+    return offset
+
+def _journal_path():
+    return f"{FILE_PATH}.journal"
+
+def _resolve_index(index, deleted):
+    # 화면상의 index -> posts.txt 상의 위치 (deleted: 삭제된 위치들, 오름차순)
+    pos = index
+    for d in deleted:
+        if d <= pos:
+            pos += 1
+        else:
+            break
+    return pos
+
+def _journal_view():
+    # 저널을 접은 결과 {'deleted': [삭제된 위치...], 'deleted_set': {...}, 'ops': {위치: [이벤트...]}}
+    # (저널 stat으로 캐시)
+    key = (_file_key(_journal_path()), _posts_identity())
+    with _posts_cache_lock:
+        if _posts_cache['journal_key'] == key and _posts_cache['journal'] is not None:
+            _posts_cache['hits'] += 1
+            return _posts_cache['journal']
+        _posts_cache['misses'] += 1
+    deleted, deleted_set, ops = [], set(), {}
+    positions = _id_positions()[1] # 이벤트마다 인덱스를 다시 stat/읽지 않도록 한 번만
+    try:
+        with open(_journal_path(), 'r', encoding='utf-8') as f:
+            for raw in f:
+                try:
+                    event = _json_loads(raw)
                 except json.JSONDecodeError:
-                    pass
-                
-                # 2) 구형 '제목|||내용' 포멧 (처음 구분자만 분리)
-                parts = line.split('|||', 1)
-                if len(parts) == 2:
-                    title, content = parts
-                    posts.append({'title': title, 'content': content, 'comments':[]})
-            return posts
+                    continue # 쓰다 만 마지막 줄 등은 무시
+                if event.get('op') == 'header':
+                    if _header_base(raw) != key[1]:
+                        break # 이미 posts.txt에 합쳐진 저널 -> 무시
+                    continue
+                pos = positions.get(event.get('id'))
+                if pos is None:
+                    continue
+                if event.get('op') == 'post_deleted':
+                    if pos not in deleted_set: # 같은 글 삭제가 두 번 기록돼도 위치는 한 번만
+                        deleted_set.add(pos)
+                        bisect.insort(deleted, pos)
+                else:
+                    ops.setdefault(pos, []).append(event)
     except FileNotFoundError:
-        # 파일이 없으면 빈 리스트 반환
-        return []
-    # ✅ open(): 파일열기
-    # ✅ readlines(): 줄 단위로 읽기
-    # ✅ strip(): 줄 끝 개행 문자 제거
-    # ✅ try/except: 파일이 없을 경우 대비
+        pass
+    view = {'deleted': deleted, 'deleted_set': deleted_set, 'ops': ops, 'base': key[1]}
+    with _posts_cache_lock:
+        _posts_cache['journal_key'] = key
+        _posts_cache['journal'] = view
+    return view
+
+def _apply_ops(post, events):
+    # 한 글에 쌓인 저널 이벤트를 순서대로 적용한 복사본 반환
+    post = _copy_post(post)
+    for event in events:
+        op = event.get('op')
+        if op == 'comment_added':
+            post.comments.append(Comment(event['comment']['text'], event['comment']['created_at']))
+        elif op == 'comment_deleted':
+            if 0 <= event['cidx'] < len(post.comments):
+                del post.comments[event['cidx']]
+        elif op == 'post_edited':
+            post.title = event['title']
+            post.content = event['content']
+            post.edited_at = event['edited_at']
+            if 'image' in event: # 이미지를 바꾸거나 지운 수정만 image를 기록
+                post.image = event['image']
+                post.image_variants = ()
+        elif op == 'image_variants':
+            if post.image == event['image']: # 썸네일을 만드는 사이 이미지가 바뀌었으면 버림
+                post.image_variants = event['variants']
+    return post
+
+def _journal_is_stale():
+    # 저널 헤더의 (inode, gen)이 지금 posts.txt와 다르면 compaction 도중 남은 저널
+    try:
+        with open(_journal_path(), 'rb') as f:
+            header = f.readline()
+    except FileNotFoundError:
+        return False
+    return _header_base(header) != _posts_identity()
+
+def _append_journal(event):
+    # 이벤트 한 줄 추가. 합치는 작업은 백그라운드 compactor에게 맡김 (요청 경로에서 전체 재작성 X)
+    # 목록용 요약(posts.txt.summary)과 이미지 참조 수(posts.txt.imgrefs)도 같은 락 안에서 함께 갱신
+    # 대상 글/댓글이 있는지는 락 안에서 확인: 동시에 들어온 같은 삭제가 두 번 기록되지 않게. 기록했으면 True
+    with _write_lock:
+        post = load_post(event['id'])
+        op = event['op']
+        if (post is None or (op == 'comment_deleted' and not 0 <= event['cidx'] < len(post.comments))
+                or (op == 'image_variants' and post.image != event['image'])):
+            return False
+        summaries = _summary_view() # 이벤트를 쓰기 "전" 상태 (없으면 여기서 만들어짐)
+        _image_refs_view()
+        old_image = new_image = ''
+        if op == 'post_deleted' or (op == 'post_edited' and 'image' in event):
+            old_image, new_image = post.image, event.get('image', '')
+        if old_image != new_image:
+            _add_image_ref(new_image, 1)
+        if _journal_is_stale():
+            os.remove(_journal_path())
+        try:
+            # 새 저널이면 헤더부터 ('x' 모드: 이미 있으면 FileExistsError)
+            with open(_journal_path(), 'xb') as f:
+                f.write(_base_header() + b'\n')
+        except FileExistsError:
+            pass
+        _append_line(_journal_path(), json.dumps(event, ensure_ascii=False).encode('utf-8'))
+        _bump_generation()
+        _invalidate_posts_cache()
+        _summary_apply_event(summaries['by_id'].get(event['id']), event)
+        if old_image != new_image:
+            _add_image_ref(old_image, -1)
+    _wake_compactor()
+    return True
+
+# 💜 목록용 요약(posts.txt.summary): 글마다 {id, 제목, 댓글 수, 마지막 활동 시각}
+# - /board는 이것만 읽음 -> 본문/댓글 배열을 전혀 건드리지 않음
+# - 글 추가/저널 이벤트 때마다 한 줄씩 덧붙임(append-only). 같은 id는 마지막 줄이 최신, {"deleted": true}는 삭제
+# - 메모리에는 읽은 위치(offset)까지만 반영해 두고, 파일이 늘어나면 늘어난 뒤쪽만 읽음
+# - 첫 줄 헤더의 (base_ino, base_gen)이 지금 posts.txt와 다르거나 파일이 없으면 iter_posts()로 한 번 재생성
+#   compaction은 posts.txt를 교체하면서 요약 파일도 새로 씀 (save_all_posts가 실제로 쓴 글에서 만든 요약)
+# - 수정 시각은 저널(post_edited의 edited_at)과 다시 쓴 줄(edited_at)에 남음 -> 재생성/compaction 후에도 같은 요약
+_summary = {'ino': None, 'base': None, 'offset': 0, 'by_id': {}, 'ids': []}
+_summary_lock = threading.Lock()
+
+def _summary_path():
+    return f"{FILE_PATH}.summary"
+
+def _summary_of(post):
+    # 글 -> 요약 (마지막 활동 = 작성/수정/댓글 시각 중 가장 늦은 것. SQLite 저장소와 같은 기준)
+    times = [post.created_at, post.edited_at] + [c.created_at for c in post.comments]
+    return {'id': post.id, 'title': post.title, 'comment_count': len(post.comments),
+            'last_activity': max(times)}
+
+def _write_summaries(summaries):
+    # 요약 파일 전체를 새로 씀 (쓰기 락 안에서 호출)
+    tmp = f"{_summary_path()}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(_base_header() + b'\n')
+        for summary in summaries:
+            f.write(json.dumps(summary, ensure_ascii=False).encode('utf-8') + b'\n')
+    os.replace(tmp, _summary_path())
+
+def _sidecar_tail(path, state, empty):
+    # 요약/참조 수 파일(첫 줄 _base_header() + append-only 줄)에서 메모리에 아직 반영하지 않은 줄들
+    # - state: 메모리 쪽 {'ino', 'base', 'offset', ...}. 새 파일이면 empty로 내용을 비우고 처음부터
+    # - 파일 inode와 posts.txt (inode, gen)이 모두 같을 때만 이어서 읽음: 둘 다 compaction 뒤 inode가 재사용될 수 있음
+    # - 파일이 없거나 헤더가 지금 posts.txt와 맞지 않으면 None (재생성 필요)
+    base = _posts_identity()
+    try:
+        f = open(path, 'rb')
+    except FileNotFoundError:
+        return [] if base is None else None
+    with f:
+        st = os.fstat(f.fileno())
+        if base is None:
+            return None
+        if state['ino'] != st.st_ino or state['base'] != base or state['offset'] > st.st_size:
+            # 새 파일 -> 처음부터. 헤더부터 확인
+            header = f.readline()
+            if not header.endswith(b'\n') or _header_base(header) != base:
+                return None
+            state.update(ino=st.st_ino, base=base, offset=len(header), **empty)
+        f.seek(state['offset'])
+        tail = f.read(st.st_size - state['offset'])
+    end = tail.rfind(b'\n') + 1 # 다른 프로세스가 쓰는 중인 마지막 줄은 다음 번에
+    state['offset'] += end
+    return tail[:end].splitlines()
+
+def _refresh_summary():
+    # 메모리 요약을 파일과 맞춤. 파일이 없거나 헤더가 맞지 않으면 False (재생성 필요)
+    lines = _sidecar_tail(_summary_path(), _summary, {'by_id': {}, 'ids': []})
+    if lines is None:
+        return False
+    by_id, ids = _summary['by_id'], _summary['ids']
+    for raw in lines:
+        try:
+            rec = _json_loads(raw)
+        except json.JSONDecodeError:
+            continue
+        post_id = rec.get('id')
+        if rec.get('deleted'):
+            if by_id.pop(post_id, None) is not None:
+                del ids[bisect.bisect_left(ids, post_id)]
+        elif isinstance(post_id, int):
+            if post_id not in by_id:
+                bisect.insort(ids, post_id)
+            by_id[post_id] = rec
+    return True
+
+def _summary_view():
+    # {'by_id': {id: 요약}, 'ids': [살아있는 id, 오름차순]} (읽기 전용)
+    for _ in range(2):
+        with _summary_lock:
+            if _refresh_summary():
+                return {'by_id': _summary['by_id'], 'ids': _summary['ids']}
+        with _write_lock:
+            with _summary_lock:
+                if _refresh_summary():
+                    return {'by_id': _summary['by_id'], 'ids': _summary['ids']}
+            _write_summaries(iter_posts(fields=_SUMMARY_FIELDS))
+    return {'by_id': {}, 'ids': []}
+
+def _append_summary(summary):
+    # 요약 한 줄 추가 (쓰기 락 안에서 호출)
+    _append_line(_summary_path(), json.dumps(summary, ensure_ascii=False).encode('utf-8'))
+
+def _summary_apply_event(summary, event):
+    # 저널 이벤트 하나가 요약에 주는 변화를 한 줄로 기록 (이벤트를 저널에 쓴 뒤에 호출)
+    if summary is None:
+        return
+    op = event['op']
+    if op == 'post_deleted':
+        _append_summary({'id': event['id'], 'deleted': True})
+    elif op == 'comment_added':
+        _append_summary({**summary, 'comment_count': summary['comment_count'] + 1,
+                         'last_activity': event['comment']['created_at']})
+    elif op == 'comment_deleted':
+        # 마지막 활동은 남은 댓글 기준으로 다시 계산 (compaction/재생성의 _summary_of와 같은 값)
+        # 저널에 이미 기록된 뒤라 load_post는 댓글이 지워진 글을 돌려줌
+        post = load_post(event['id'])
+        if post is not None:
+            _append_summary(_summary_of(post))
+    elif op == 'post_edited':
+        _append_summary({**summary, 'title': event['title'],
+                         'last_activity': max(summary['last_activity'], event['edited_at'])})
+
+def count_summaries():
+    return len(_summary_view()['ids'])
+
+def list_summaries(start, limit):
+    # 화면상의 start번째부터 limit개 요약
+    view = _summary_view()
+    with _summary_lock:
+        return [view['by_id'][i] for i in view['ids'][max(start, 0):max(start, 0) + max(limit, 0)]]
+
+def list_summaries_after(post_id, limit):
+    view = _summary_view()
+    with _summary_lock:
+        first = bisect.bisect_right(view['ids'], post_id)
+        return [view['by_id'][i] for i in view['ids'][first:first + max(limit, 0)]]
+
+# 💜 세대 번호(posts.txt.gen): 쓰기(글 추가, 저널 추가, compaction)마다 1씩 올리는 8바이트 카운터
+# - 쓰기 락 안에서만 올림 -> 모든 워커 프로세스가 같은 값을 봄 (페이지 캐시/ETag가 워커마다 어긋나지 않음)
+# - stat(mtime/크기/inode)만으로는 mtime 해상도가 낮은 파일시스템이나 compaction 뒤 inode 재사용 때 구분이 안 될 수 있음
+_GEN = struct.Struct('<Q')
+
+def _generation_path():
+    return f"{FILE_PATH}.gen"
+
+def data_generation():
+    try:
+        with open(_generation_path(), 'rb') as f:
+            data = f.read(_GEN.size)
+    except FileNotFoundError:
+        return 0
+    return _GEN.unpack(data)[0] if len(data) == _GEN.size else 0
+
+def _bump_generation():
+    # 쓰기 락 안에서 호출. 8바이트를 제자리에 덮어씀
+    value = data_generation() + 1
+    fd = os.open(_generation_path(), os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        os.pwrite(fd, _GEN.pack(value), 0)
+    finally:
+        os.close(fd)
+    return value
+
+# 💜 HTTP 캐시 검증용 버전: 내용이 바뀌면 반드시 달라지는 값 (ETag 재료) + 마지막 수정 시각
+# - 목록: 세대 번호 + posts.txt/저널 stat (_snapshot_key: 앱 밖에서 파일을 고친 경우 대비). 어떤 글이든 바뀌면 달라짐
+# - 글 한 건: (posts.txt가 어떤 파일인지, 그 글 줄의 위치, 그 글에 쌓인 저널 이벤트 수)
+#   -> 다른 글에 댓글이 달려도 이 글의 ETag는 그대로. compaction 후에는 한 번 달라짐
+# - 마지막 수정 시각은 파일 mtime (글 한 건도 전체 기준: If-Modified-Since만 보내는 클라이언트를 위한 보수적인 값)
+def cache_version(post_id=None):
+    # (버전 문자열, 마지막 수정 시각(초) 또는 None). 글이 없으면 버전이 None
+    for _ in range(3):
+        key = _snapshot_key()
+        if key[0] is None:
+            return ('empty' if post_id is None else None), None
+        if post_id is None:
+            version = repr((data_generation(), key))
+        else:
+            base = _posts_base()
+            view = _journal_view()
+            pos = _id_positions()[1].get(post_id)
+            version = None
+            if pos is not None and pos not in view['deleted_set']:
+                version = repr((base, _index_entry(pos), len(view['ops'].get(pos, ()))))
+        if _snapshot_key() == key:
+            break # 읽는 도중 compaction이 끼어들지 않았음
+    return version, max(k[0] for k in key if k is not None) / 1e9
+
+# 💜 검색용 역색인(inverted index): 토큰 -> 그 토큰이 들어 있는 글 id 집합 (프로세스 메모리)
+# - 토큰: 제목/본문/댓글을 소문자로 바꿔 단어(\w+)로 나눈 뒤, 글자 하나씩 + 붙어 있는 두 글자(bigram)
+#   한글은 띄어쓰기/조사 때문에 단어 단위로는 잘 안 맞아서 글자 bigram 사용 ("게시판에" 안의 "게시판"도 찾음)
+# - 검색: 검색어의 bigram(한 글자 단어는 그 글자)을 모두 가진 글 = 글 id 집합의 교집합 (작은 집합부터)
+#   bigram이 다 있어도 단어가 없을 수 있으므로("게시 시판" 안의 "게시판") 후보 글만 디스크에서 읽어 단어를 다시 확인
+#   (본문은 메모리에 두지 않음 -> 워커마다 전체 글을 들고 있지 않도록)
+# - 갱신은 따라잡기(tail) 방식: 검색할 때 마지막으로 본 뒤에 생긴 것만 반영 -> 다른 워커 프로세스의 쓰기도 반영됨
+#   새 글: 마지막으로 본 것보다 큰 id (새 글은 항상 파일 끝에, 더 큰 id로) / 댓글·수정·삭제: 저널에 새로 붙은 줄
+#   compaction으로 posts.txt가 교체돼도 글 id는 그대로 -> 다시 색인하지 않고, 교체 전 저널(posts.txt.journal.prev)의
+#   못 본 뒷부분만 반영한 뒤 저널 커서만 처음으로. prev가 마지막으로 본 posts.txt 기준이 아니면(그 사이 compaction이
+#   두 번 등) 무엇을 놓쳤는지 알 수 없으므로 처음부터 다시 만듦
+_WORD_RE = re.compile(r'\w+')
+_search = {'base': None, 'next_id': 0, 'journal_header': None, 'journal_offset': 0, 'postings': {}, 'docs': {},
+           'rebuilds': 0}
+_search_lock = threading.Lock()
+
+def _search_tokens(text):
+    tokens = set()
+    for word in _WORD_RE.findall(text.lower()):
+        tokens.update(word)
+        tokens.update(word[i:i + 2] for i in range(len(word) - 1))
+    return tokens
+
+def _query_tokens(query):
+    # 검색어는 bigram만 (한 글자 단어는 글자 그대로) -> 후보가 훨씬 적음
+    tokens = set()
+    for word in _WORD_RE.findall(query.lower()):
+        if len(word) == 1:
+            tokens.add(word)
+        else:
+            tokens.update(word[i:i + 2] for i in range(len(word) - 1))
+    return tokens
+
+def _bigram_text(text):
+    # 단어마다 붙어 있는 두 글자를 공백으로 이어 붙인 문자열 ("게시판" -> "게시 시판")
+    # SQLite 저장소의 posts_bigram(unicode61)에 넣으면 bigram 하나가 토큰 하나 -> 2글자 검색어도 FTS로 찾음
+    return ' '.join(word[i:i + 2] for word in _WORD_RE.findall((text or '').lower()) for i in range(len(word) - 1))
+
+def _search_text(post):
+    # 제목/본문/댓글을 줄바꿈으로 이어 붙인 소문자 문자열 (검색어 단어(\w+)는 줄바꿈을 넘어서 맞지 않음)
+    return '\n'.join([post.title, post.content] + [c.text for c in post.comments]).lower()
+
+def _search_index_post(post_id, post):
+    # 글 한 건의 토큰을 바꿔 끼움 (post가 None이면 삭제)
+    postings, docs = _search['postings'], _search['docs']
+    for token in docs.pop(post_id, ()):
+        ids = postings[token]
+        ids.discard(post_id)
+        if not ids:
+            del postings[token]
+    if post is None:
+        return
+    tokens = _search_tokens(_search_text(post))
+    docs[post_id] = frozenset(tokens)
+    for token in tokens:
+        postings.setdefault(token, set()).add(post_id)
+
+def _posts_base():
+    # 지금 posts.txt가 어떤 파일인지: (inode, 첫 줄). 파일이 없으면 None
+    try:
+        with open(FILE_PATH, 'rb') as f:
+            return os.fstat(f.fileno()).st_ino, f.readline()
+    except FileNotFoundError:
+        return None
+
+def _prev_journal_path():
+    # compaction 직전의 저널 (검색 색인이 못 본 이벤트를 따라잡는 용도)
+    return f"{FILE_PATH}.journal.prev"
+
+def _search_rebuild(base):
+    # 처음부터 다시 색인. 시작 전에 "어디까지 봤는지"를 먼저 잡아 두고,
+    # 그 사이에 생긴 글/저널은 다음 따라잡기에서 한 번 더 반영 (같은 글을 다시 색인해도 결과는 같음)
+    _search.update(base=base, next_id=_next_post_id(), journal_header=None, journal_offset=0, postings={}, docs={})
+    _search['rebuilds'] += 1
+    for post in iter_posts():
+        _search_index_post(post.id, post)
+
+def _search_journal_ids(tail, base):
+    # 저널 조각 -> (이벤트가 가리키는 글 id들, 읽은 바이트 수). 쓰는 중인 마지막 줄은 다음 번에
+    end = tail.rfind(b'\n') + 1
+    ids = set()
+    for raw in tail[:end].splitlines():
+        try:
+            event = _json_loads(raw)
+        except json.JSONDecodeError:
+            continue
+        if event.get('op') == 'header':
+            if _header_base(raw) != base:
+                break # 이미 posts.txt에 합쳐진 옛 저널
+        elif 'id' in event:
+            ids.add(event['id'])
+    return ids, end
+
+def _search_missed_before_compaction():
+    # 마지막으로 본 posts.txt 기준 저널에서 아직 못 본 이벤트의 글 id들 (그 저널이 없으면 None)
+    # compaction은 저널을 prev로 넘김. 교체 직후 죽었으면 아직 원래 이름으로 남아 있음
+    old = _search['base']
+    for path in (_prev_journal_path(), _journal_path()):
+        try:
+            with open(path, 'rb') as f:
+                header = f.readline()
+                if _header_base(header) != old:
+                    continue
+                f.seek(_search['journal_offset'] if header == _search['journal_header'] else 0)
+                return _search_journal_ids(f.read(), old)[0]
+        except FileNotFoundError:
+            continue
+    return None
+
+def _search_refresh():
+    # 마지막으로 본 뒤에 생긴 변경만 반영 (_search_lock 안에서 호출)
+    base = _posts_identity()
+    if base is None:
+        _search.update(base=None, next_id=0, journal_header=None, journal_offset=0, postings={}, docs={})
+        return
+    changed = set()
+    if _search['base'] != base:
+        missed = _search_missed_before_compaction() if _search['base'] is not None else None
+        if missed is None:
+            _search_rebuild(base)
+        else:
+            changed |= missed
+            _search.update(base=base, journal_header=None, journal_offset=0)
+    # 1) 새 글 (인덱스에 위치가 추가됨. 인덱스 레코드는 글 줄을 다 쓴 뒤에 붙으므로 반쯤 쓴 글은 안 보임)
+    ids = _id_positions()[0]
+    for post_id in reversed(ids):
+        if post_id < _search['next_id']:
+            break
+        changed.add(post_id)
+    if ids:
+        _search['next_id'] = max(_search['next_id'], ids[-1] + 1)
+    # 2) 저널에 새로 붙은 이벤트
+    # 남아 있던 옛 저널은 다음 쓰기 때 새 저널로 바뀜 -> 첫 줄(헤더)이 달라졌으면 처음부터
+    try:
+        with open(_journal_path(), 'rb') as f:
+            header = f.readline()
+            if header != _search['journal_header']:
+                _search.update(journal_header=header, journal_offset=0)
+            f.seek(_search['journal_offset'])
+            tail = f.read()
+    except FileNotFoundError:
+        tail = b''
+    journal_ids, end = _search_journal_ids(tail, base)
+    changed |= journal_ids
+    _search['journal_offset'] += end
+    # 따라잡는 도중 compaction이 끼어도 괜찮음: 다음 검색 때 prev 저널의 같은 커서부터 다시 따라잡음
+    posts = load_posts_by_id(changed)
+    for post_id in changed:
+        _search_index_post(post_id, posts.get(post_id))
+
+def search_posts(query, limit):
+    # 검색어가 들어 있는 글 (전체 개수, 최신 글부터 limit개의 요약)
+    tokens = _query_tokens(query)
+    if not tokens:
+        return 0, []
+    with _search_lock:
+        _search_refresh()
+        postings = _search['postings']
+        sets = sorted((postings.get(t, ()) for t in tokens), key=len)
+        found = set(sets[0]).intersection(*sets[1:]) if sets[0] else set()
+    # bigram 후보 중 단어가 실제로 들어 있는 글만 (후보 글만 디스크에서 읽음)
+    words = _WORD_RE.findall(query.lower())
+    posts = load_posts_by_id(found)
+    found = {i for i, post in posts.items() if all(w in _search_text(post) for w in words)}
+    ids = sorted(found, reverse=True)[:max(limit, 0)]
+    view = _summary_view()
+    with _summary_lock:
+        return len(found), [view['by_id'][i] for i in ids if i in view['by_id']]
+
+def search_stats():
+    with _search_lock:
+        return {'docs': len(_search['docs']), 'tokens': len(_search['postings']), 'rebuilds': _search['rebuilds']}
+
+# 💜 Compaction: 저널 + posts.txt의 죽은 줄(삭제/수정된 글의 옛 버전)을 정리
+# - 살아있는 글만 임시 파일에 쓰고 fsync 후 os.replace()로 한 번에 교체 (중간에 죽어도 반쯤 쓴 파일이 안 남음)
+# - 백그라운드 스레드가 "죽은 바이트 비율 > COMPACT_DEAD_RATIO" 일 때 실행
+# - 수동 실행: flask --app app compact
+# - 다시 쓴 파일에는 형식 헤더가 붙음 (구형 줄만 한 번에 바꾸려면 flask --app app migrate)
+app.config.setdefault('COMPACT_DEAD_RATIO', 0.3)      # 죽은 바이트가 전체의 30% 넘으면 정리
+app.config.setdefault('COMPACT_MIN_DEAD_BYTES', 64 * 1024) # 너무 작은 파일은 굳이 정리하지 않음
+app.config.setdefault('COMPACT_CHECK_INTERVAL', 30)   # 초. 쓰기가 없어도 이 간격으로 한 번씩 확인
+app.config.setdefault('COMPACT_IN_BACKGROUND', True)
+
+_compactor = {'thread': None, 'lock': threading.Lock(), 'wake': threading.Event(), 'runs': 0}
+
+def compaction_stats():
+    # 죽은 바이트 = 저널 전체 + 저널 때문에 더 이상 안 쓰는 posts.txt 줄들
+    data_size = os.path.getsize(FILE_PATH) if os.path.exists(FILE_PATH) else 0
+    journal_size = os.path.getsize(_journal_path()) if os.path.exists(_journal_path()) else 0
+    view = _journal_view()
+    dead = journal_size if view['deleted'] or view['ops'] else 0
+    dead_pos = set(view['deleted']) | set(view['ops'])
+    if dead_pos:
+        # 죽은 줄이 걸친 구간의 인덱스 레코드를 한 번에 읽고 길이만 더함 (위치마다 인덱스를 열지 않음)
+        first = min(dead_pos)
+        entries = _index_entries(first, max(dead_pos) - first + 1)
+        dead += sum(entries[pos - first][1] + 1 for pos in dead_pos if pos - first < len(entries))
+    total = data_size + journal_size
+    return {
+        'dead_bytes': dead,
+        'total_bytes': total,
+        'dead_ratio': dead / total if total else 0.0,
+        'runs': _compactor['runs'],
+    }
+
+def _needs_compaction():
+    stats = compaction_stats()
+    return (stats['dead_bytes'] >= app.config['COMPACT_MIN_DEAD_BYTES']
+            and stats['dead_ratio'] > app.config['COMPACT_DEAD_RATIO'])
+
+def compact_posts(only_if_needed=False):
+    # 저널을 반영한 최종 목록을 posts.txt에 원자적으로 다시 쓰고 저널은 prev로 넘김
+    # only_if_needed: 락을 잡은 뒤 다시 확인 (여러 워커의 compactor가 동시에 깨어났을 때 한 번만 실행)
+    with _write_lock:
+        if not os.path.exists(FILE_PATH):
+            return False
+        if only_if_needed and not _needs_compaction():
+            return False
+        if _journal_is_stale():
+            os.remove(_journal_path())
+        old_header = _base_header()
+        # 전체 리스트를 만들지 않고 한 건씩 새 파일로 흘려 씀 (요약/이미지 참조 수는 실제로 쓴 글에서 계산)
+        summaries, refs = save_all_posts(iter_posts(), next_id=_next_post_id())
+        # 저널은 지우지 않고 prev로 넘김: 다른 워커의 검색 색인이 못 본 뒷부분만 따라잡도록
+        # 저널이 없었으면 헤더만 있는 prev (prev의 헤더 = 바로 전 posts.txt -> 따라잡을 수 있는지 판단 기준)
+        try:
+            os.replace(_journal_path(), _prev_journal_path())
+        except FileNotFoundError:
+            with open(_prev_journal_path(), 'wb') as f:
+                f.write(old_header + b'\n')
+        _write_summaries(summaries) # 새 posts.txt 에 맞춘 헤더 + 글마다 한 줄
+        _write_image_refs(refs)
+        _invalidate_posts_cache()
+        _compactor['runs'] += 1
+    return True
+
+def _compactor_loop():
+    while True:
+        _compactor['wake'].wait(app.config['COMPACT_CHECK_INTERVAL'])
+        _compactor['wake'].clear()
+        try:
+            if _needs_compaction():
+                compact_posts(only_if_needed=True)
+        except Exception:
+            app.logger.exception("background compaction failed")
+
+def _wake_compactor():
+    # 처음 쓰기가 일어날 때 데몬 스레드를 띄우고, 이후엔 깨우기만 함
+    if not app.config['COMPACT_IN_BACKGROUND']:
+        return
+    if _compactor['thread'] is None:
+        with _compactor['lock']:
+            if _compactor['thread'] is None:
+                t = threading.Thread(target=_compactor_loop, name='posts-compactor', daemon=True)
+                t.start()
+                _compactor['thread'] = t
+    _compactor['wake'].set()
+
+@app.cli.command('compact')
+def compact_command():
+    """posts.txt + 저널을 지금 바로 정리한다."""
+    # 죽은 줄이 없으면 다시 쓰지 않음 (깨끗한 파일의 gen만 바뀌어서 캐시/사이드카가 전부 새로 만들어지지 않도록)
+    # 구형 줄만 바꾸는 건 migrate가 함
+    with _write_lock:
+        before = compaction_stats()
+        if before['dead_bytes'] and compact_posts():
+            print(f"compacted: {before['total_bytes']} -> {os.path.getsize(FILE_PATH)} bytes "
+                  f"(dead {before['dead_bytes']} bytes, {before['dead_ratio']:.0%})")
+        else:
+            print("nothing to compact")
+
+@app.cli.command('migrate')
+def migrate_command():
+    """구형 '제목|||내용' 줄이 섞인 posts.txt를 형식 헤더가 붙은 JSONL로 한 번에 다시 쓴다."""
+    try:
+        with open(FILE_PATH, 'rb') as f:
+            if not _skip_format_header(f):
+                print(f"already migrated (format {_POSTS_FORMAT})")
+                return
+            legacy = 0
+            for raw in f:
+                if raw.strip():
+                    try:
+                        _json_loads(raw)
+                    except (UnicodeDecodeError, json.JSONDecodeError):
+                        legacy += 1
+    except FileNotFoundError:
+        print("nothing to migrate")
+        return
+    compact_posts() # 저널까지 합쳐서 헤더 + JSONL로 원자적으로 교체
+    print(f"migrated to format {_POSTS_FORMAT}: {legacy} legacy lines converted")
 
 # 💜함수: 글 추가 저장하기
-def save_post(title, content):
-    # 새 글 한건을 JSON 한 줄로 저장. (줄바꿈/이모지 안전)
+def save_post(title, content, image=''):
+    # 새 글 한건을 JSON 한 줄로 저장하고 새 글 id 반환. (줄바꿈/이모지 안전)
+    # - image: save_image()가 돌려준 static 기준 경로 (없으면 빈 문자열)
     # - ensure_ascii=False: 한글이 \uXXXX로 꺠지지 않게 
     # - 내용 안의 줄바꿈은 팔일에 \n으로 안전하게 기록됨
-    obj = {'title': title, 'content': content, 'comments': []}
-    with open(FILE_PATH, 'a', encoding='utf-8') as f:
+    # - 바이트 오프셋을 정확히 알기 위해 바이너리 모드로 씀 (윈도우 \r\n 변환 방지)
+    with _write_lock:
+        _summary_view() # 요약 파일이 없으면 이 글을 쓰기 "전" 상태로 먼저 만들어 둠
+        _image_refs_view() # 이미지 참조 수 파일도 마찬가지
+        post_id = _next_post_id()
+        created_at = datetime.now().isoformat(timespec='seconds')
+        # 가벼운 필드를 앞에 (필드 선택 파싱 참고)
+        obj = {'id': post_id, 'title': title, 'created_at': created_at, 'comment_count': 0,
+               'last_activity': created_at, 'image': image, 'content': content, 'comments': []}
+        line = json.dumps(obj, ensure_ascii=False).encode('utf-8')
+        before = _file_key(FILE_PATH)
+        if before is None or before[1] == 0:
+            _append_line(FILE_PATH, _format_header()) # 새 파일은 처음부터 JSONL 형식
+        _add_image_ref(image, 1) # 글보다 먼저 (이미지 참조 수 참고)
         # f.write(f"{title}|||{content}\n") 하단의 JSON 코드로 변경
-        f.write(json.dumps(obj, ensure_ascii=False) + '\n')
+        offset = _append_line(FILE_PATH, line)
+        _bump_generation()
+        _invalidate_posts_cache()
+        _append_index(before, (offset, len(line), post_id))
+        _append_summary({'id': post_id, 'title': title, 'comment_count': 0, 'last_activity': created_at})
+    return post_id
 # ✅ 'a' 모드: 파일 끝에 내용을 "추가"
 # ✅  write(): 글 내용 + 줄바꿈 저장
 
-# 💜글 전체 다시 저장 (수정/삭제 후), 항상 JSON Lines 형식으로 덮어씀
-def save_all_posts(posts):
-    with open(FILE_PATH, 'w', encoding='utf-8') as f:
-        for p in posts:
-            # f.write(f"{p['title']}|||{p['content']}\n") 하단의 JSON 코드로 변경
-            f.write(json.dumps({
-                'title': p['title'], 
-                'content': p['content'],
-                'comments': p.get('comments', [])
-                }, ensure_ascii=False) + '\n')
+def _append_index(before, entry):
+    # 인덱스가 추가 직전 파일 상태와 일치하면 레코드 1개만 덧붙이고 헤더 갱신 (O(1))
+    # 아니면 다음 조회 때 전체 재생성되도록 둔다
+    next_id = entry[2] + 1
+    try:
+        with open(_index_path(), 'r+b') as f:
+            if not _index_is_fresh(f, before):
+                return
+            f.seek(0, os.SEEK_END)
+            f.write(_IDX_ENTRY.pack(*entry))
+            f.seek(0)
+            f.write(_index_header(_file_key(FILE_PATH), next_id))
+    except FileNotFoundError:
+        if before is None:
+            _write_index([entry], _file_key(FILE_PATH), next_id)
+
+# 💜글 전체 다시 저장 (compaction 전용), 항상 JSON Lines 형식으로 덮어씀
+# - 임시 파일에 다 쓰고 fsync -> os.replace() 로 교체: 읽는 쪽은 항상 "옛 파일 전체" 아니면 "새 파일 전체"를 봄
+# - next_id: 지워진 글의 id를 다시 쓰지 않도록 "다음 글 id"를 이어받음
+# - (쓴 글들의 목록용 요약 리스트, 이미지 참조 수 Counter)를 반환 (compaction이 요약/참조 수 파일을 새로 쓸 때 사용)
+def save_all_posts(posts, next_id=1):
+    entries = [] # 새 파일 기준 오프셋 인덱스도 같이 만든다
+    summaries = []
+    refs = Counter()
+    header = _format_header()
+    offset = len(header) + 1
+    tmp = f"{FILE_PATH}.tmp"
+    with _write_lock:
+        with open(tmp, 'wb') as f:
+            f.write(header + b'\n') # 전부 JSONL로 다시 쓰므로 형식 헤더를 붙임
+            for p in posts:
+                # f.write(f"{p['title']}|||{p['content']}\n") 하단의 JSON 코드로 변경
+                # 가벼운 필드(_HEAD_FIELDS)를 앞에, 본문/댓글을 뒤에
+                summary = _summary_of(p)
+                summaries.append(summary)
+                if p.image:
+                    refs[p.image] += 1
+                line = json.dumps({
+                    'id': p.id,
+                    'title': p.title, 
+                    'created_at': p.created_at,
+                    'comment_count': summary['comment_count'],
+                    'last_activity': summary['last_activity'],
+                    'image': p.image,
+                    'image_variants': p.image_variants,
+                    'edited_at': p.edited_at,
+                    'content': p.content,
+                    'comments': [{'text': c.text, 'created_at': c.created_at} for c in p.comments]
+                    }, ensure_ascii=False).encode('utf-8')
+                f.write(line + b'\n')
+                entries.append((offset, len(line), p.id))
+                next_id = max(next_id, p.id + 1)
+                offset += len(line) + 1
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, FILE_PATH)
+        _fsync_dir(os.path.dirname(os.path.abspath(FILE_PATH)))
+        _bump_generation()
+        _invalidate_posts_cache()
+        _write_index(entries, _file_key(FILE_PATH), next_id)
+    return summaries, refs
+
+def _fsync_dir(path):
+    # 교체(rename) 자체가 디스크에 남도록 디렉터리도 fsync (윈도우는 지원 안 해서 건너뜀)
+    if os.name != 'posix':
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
 
 # 💜 댓글 추가
-def add_comment(index, text):
-    #index번째 글에 댓글 추가, 성공 시 True
-    posts = load_posts()
-    if 0 <= index < len(posts) and text:
-        posts[index].setdefault('comments', [])
-        posts[index]['comments'].append({
-            'text': text,
-            'created_at': datetime.now().isoformat(timespec='seconds')
-        })
-        save_all_posts(posts)
-        return True
-    return False
-
-# 💜 댓글 삭제
-def delete_comment(index, cidx):
-    posts = load_posts()
-    if 0 <= index < len(posts):
-        comments = posts[index].get('comments', [])
-        if 0 <= cidx < len(comments):
-            del comments[cidx]
-            save_all_posts(posts)
+def add_comment(post_id, text):
+    #post_id 글에 댓글 추가, 성공 시 True (파일 전체를 다시 쓰지 않고 저널에 한 줄 추가)
+    if not text:
+        return False
+    return _append_journal({'op': 'comment_added', 'id': post_id, 'comment': {
+        'text': text,
+        'created_at': datetime.now().isoformat(timespec='seconds')
+    }})
+
+# 💜 댓글 삭제 (없는 글/댓글이면 아무것도 기록하지 않음)
+def delete_comment(post_id, cidx):
+    _append_journal({'op': 'comment_deleted', 'id': post_id, 'cidx': cidx})
+    return True
+
+# 💜 글 수정 / 삭제 (저널에 기록. 글이 없으면 False)
+def edit_post(post_id, title, content, image=None):
+    # image: None이면 기존 이미지 유지, 빈 문자열이면 이미지 삭제
+    event = {'op': 'post_edited', 'id': post_id, 'title': title, 'content': content,
+             'edited_at': datetime.now().isoformat(timespec='seconds')}
+    if image is not None:
+        event['image'] = image
+    return _append_journal(event)
+
+def set_image_variants(post_id, image, variants):
+    # 썸네일 작업이 끝나면 호출. 그 사이 글이 지워졌거나 이미지가 바뀌었으면 False
+    return _append_journal({'op': 'image_variants', 'id': post_id, 'image': image, 'variants': variants})
+
+def delete_post(post_id):
+    return _append_journal({'op': 'post_deleted', 'id': post_id})
+
+# 💜 이미지 참조 수(posts.txt.imgrefs): {이미지 경로: 그 이미지를 쓰는 글 수} (업로드 파일 정리용)
+# - 요약 파일과 같은 방식: 쓰기마다 {"image": 경로, "delta": +1/-1} 한 줄을 덧붙이고(append-only), 메모리에는 합계(Counter)
+#   글 추가(save_post), 이미지를 바꾼 수정과 글 삭제(_append_journal)가 기록 -> collect_image는 글을 다시 세지 않음
+# - 늘리는 줄은 글/저널보다 먼저, 줄이는 줄은 나중에 씀: 그 사이에 죽어도 수가 많게 남을 뿐 (쓰는 파일을 지우지 않음)
+# - 첫 줄 헤더가 지금 posts.txt와 다르거나 파일이 없으면 iter_posts(fields=('image',))로 한 번 재생성 (요약 파일과 같음)
+#   compaction은 실제로 쓴 글에서 센 값으로 새로 씀
+_image_refs = {'ino': None, 'base': None, 'offset': 0, 'counts': Counter()}
+_image_refs_lock = threading.Lock()
+
+def _image_refs_path():
+    return f"{FILE_PATH}.imgrefs"
+
+def _write_image_refs(counts):
+    # 참조 수 파일 전체를 새로 씀 (쓰기 락 안에서 호출). 이미지마다 합계 한 줄
+    tmp = f"{_image_refs_path()}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(_base_header() + b'\n')
+        for image, refs in counts.items():
+            if refs > 0:
+                f.write(json.dumps({'image': image, 'delta': refs}, ensure_ascii=False).encode('utf-8') + b'\n')
+    os.replace(tmp, _image_refs_path())
+
+def _refresh_image_refs():
+    # 메모리 합계를 파일과 맞춤. 파일이 없거나 헤더가 맞지 않으면 False (재생성 필요)
+    lines = _sidecar_tail(_image_refs_path(), _image_refs, {'counts': Counter()})
+    if lines is None:
+        return False
+    counts = _image_refs['counts']
+    for raw in lines:
+        try:
+            rec = _json_loads(raw)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(rec.get('image'), str) and isinstance(rec.get('delta'), int):
+            counts[rec['image']] += rec['delta']
     return True
 
+def _image_refs_view():
+    # 지금의 {이미지 경로: 참조 수} (읽기 전용, _image_refs_lock 안에서 읽을 것)
+    for _ in range(2):
+        with _image_refs_lock:
+            if _refresh_image_refs():
+                return _image_refs['counts']
+        with _write_lock:
+            with _image_refs_lock:
+                if _refresh_image_refs():
+                    return _image_refs['counts']
+            _write_image_refs(Counter(p['image'] for p in iter_posts(fields=('image',)) if p['image']))
+    return Counter()
+
+def _add_image_ref(image, delta):
+    # 참조 수 변화 한 줄 추가 (쓰기 락 안에서, _image_refs_view()로 파일을 맞춘 뒤 호출)
+    if image:
+        _append_line(_image_refs_path(), json.dumps({'image': image, 'delta': delta}, ensure_ascii=False).encode('utf-8'))
+
+def image_refs(image):
+    counts = _image_refs_view()
+    with _image_refs_lock:
+        return max(counts[image], 0)
+
+# 💜 저장소 인터페이스(PostStore)
+# - 라우트는 get_store()가 돌려주는 저장소만 사용 -> 저장 방식을 설정(POST_STORE)으로 바꿀 수 있음
+#   'jsonl' : 지금까지의 posts.txt (+ 인덱스/저널/compaction) 방식 (기본값)
+#   'sqlite': posts.db (WAL 모드). 상세/댓글 추가/삭제가 인덱스를 타는 한 줄짜리 쿼리
+# - 글은 고유 id로 찾음 (삭제돼도 다른 글 id는 그대로). 목록의 start만 "화면상의 번호"(0부터, 오래된 글 순)
+app.config.setdefault('POST_STORE', os.environ.get('POST_STORE', 'jsonl'))
+app.config.setdefault('SQLITE_PATH', 'posts.db')
+
+class PostStore(ABC):
+    """글/댓글 저장소 인터페이스. 글은 Post(id, title, content, image, created_at, comments=[Comment, ...], image_variants)."""
+
+    @abstractmethod
+    def load_posts(self):
+        # 전체 글 목록 (읽기 전용으로 다룰 것)
+        ...
+
+    @abstractmethod
+    def load_post(self, post_id):
+        # 글 한 건, 없으면 None
+        ...
+
+    @abstractmethod
+    def iter_posts(self, start=0, limit=None, fields=None):
+        # 글을 하나씩 내보내는 제너레이터 (메모리에 전체 목록을 만들지 않음)
+        ...
+
+    @abstractmethod
+    def count_posts(self):
+        ...
+
+    @abstractmethod
+    def list_posts(self, start, limit):
+        # start번째부터 limit개 (페이지 크기에 비례하는 비용으로)
+        ...
+
+    @abstractmethod
+    def list_posts_after(self, post_id, limit):
+        # 커서 방식: id가 post_id보다 큰 글부터 limit개
+        ...
+
+    @abstractmethod
+    def list_summaries(self, start, limit):
+        # 목록 화면용 요약 {'id', 'title', 'comment_count', 'last_activity'} (본문/댓글은 읽지 않음)
+        ...
+
+    @abstractmethod
+    def list_summaries_after(self, post_id, limit):
+        ...
+
+    @abstractmethod
+    def search(self, query, limit):
+        # 제목/본문/댓글에 검색어가 들어 있는 글: (전체 개수, 최신 글부터 limit개의 요약)
+        ...
+
+    @abstractmethod
+    def cache_version(self, post_id=None):
+        # ETag용 (버전 문자열, 마지막 수정 시각(초) 또는 None): 목록 전체(None) 또는 글 한 건 (없으면 버전 None)
+        ...
+
+    @abstractmethod
+    def save_post(self, title, content, image=''):
+        # 새 글 id 반환. image: static 기준 이미지 경로 (save_image 참고)
+        ...
+
+    @abstractmethod
+    def edit_post(self, post_id, title, content, image=None):
+        # 성공 시 True. image가 None이면 기존 이미지 유지
+        ...
+
+    @abstractmethod
+    def set_image_variants(self, post_id, image, variants):
+        # 썸네일 목록 기록. 글의 이미지가 아직 image일 때만 (성공 시 True)
+        ...
+
+    @abstractmethod
+    def image_refs(self, image):
+        # 업로드 파일 image(static 기준 경로)를 쓰는 글 수
+        ...
+
+    @abstractmethod
+    def delete_post(self, post_id):
+        # 성공 시 True. 지운 글의 이미지를 다른 글이 안 쓰면 파일도 지움 (이미지를 바꾼 edit_post도 같음)
+        ...
+
+    @abstractmethod
+    def add_comment(self, post_id, text):
+        ...
+
+    @abstractmethod
+    def delete_comment(self, post_id, cidx):
+        ...
+
+    def stats(self):
+        # /metrics 에 보여줄 저장소별 정보
+        return {}
+
+class JsonlPostStore(PostStore):
+    """posts.txt(JSON Lines) 저장소. 실제 구현은 위의 모듈 함수들."""
+
+    def load_posts(self):
+        return load_posts()
+
+    def load_post(self, post_id):
+        return load_post(post_id)
+
+    def iter_posts(self, start=0, limit=None, fields=None):
+        return iter_posts(start, limit, fields)
+
+    def count_posts(self):
+        return count_summaries()
+
+    def list_posts(self, start, limit):
+        return list_posts(start, limit)
+
+    def list_posts_after(self, post_id, limit):
+        return list_posts_after(post_id, limit)
+
+    def list_summaries(self, start, limit):
+        return list_summaries(start, limit)
+
+    def list_summaries_after(self, post_id, limit):
+        return list_summaries_after(post_id, limit)
+
+    def search(self, query, limit):
+        return search_posts(query, limit)
+
+    def cache_version(self, post_id=None):
+        return cache_version(post_id)
+
+    def save_post(self, title, content, image=''):
+        return save_post(title, content, image)
+
+    def edit_post(self, post_id, title, content, image=None):
+        old = load_post(post_id)
+        if not edit_post(post_id, title, content, image):
+            return False
+        if image is not None and image != old.image:
+            collect_image(self, old.image)
+        return True
+
+    def set_image_variants(self, post_id, image, variants):
+        return set_image_variants(post_id, image, variants)
+
+    def image_refs(self, image):
+        return image_refs(image)
+
+    def delete_post(self, post_id):
+        old = load_post(post_id)
+        if not delete_post(post_id):
+            return False
+        collect_image(self, old.image)
+        return True
+
+    def add_comment(self, post_id, text):
+        return add_comment(post_id, text)
+
+    def delete_comment(self, post_id, cidx):
+        return delete_comment(post_id, cidx)
+
+    def stats(self):
+        return {'posts_cache': cache_stats(), 'decode': decode_stats(), 'search': search_stats(),
+                'compaction': compaction_stats()}
+
+class SqlitePostStore(PostStore):
+    """SQLite 저장소. 스레드마다 연결을 하나씩 씀 (sqlite3 연결은 스레드 간 공유 X)."""
+
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS posts (
+            id         INTEGER PRIMARY KEY AUTOINCREMENT,
+            title      TEXT NOT NULL,
+            content    TEXT NOT NULL,
+            image      TEXT NOT NULL DEFAULT '',
+            image_variants TEXT NOT NULL DEFAULT '', -- 썸네일 목록 (JSON)
+            created_at TEXT NOT NULL,
+            edited_at  TEXT NOT NULL DEFAULT '', -- 마지막 수정 시각 (댓글을 지울 때 last_activity 재계산용)
+            comment_count INTEGER NOT NULL DEFAULT 0, -- 목록용 요약 (트리거로 유지)
+            last_activity TEXT NOT NULL DEFAULT ''
+        );
+        CREATE TABLE IF NOT EXISTS comments (
+            id         INTEGER PRIMARY KEY AUTOINCREMENT,
+            post_id    INTEGER NOT NULL REFERENCES posts(id) ON DELETE CASCADE,
+            text       TEXT NOT NULL,
+            created_at TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_comments_post_id ON comments(post_id, id);
+        CREATE INDEX IF NOT EXISTS idx_comments_created_at ON comments(created_at);
+        CREATE INDEX IF NOT EXISTS idx_posts_created_at ON posts(created_at);
+
+        -- 글 수를 COUNT(*) 대신 저장해 두고 트리거로 유지 (목록 페이지네이션용)
+        CREATE TABLE IF NOT EXISTS meta (
+            key   TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        );
+        INSERT OR IGNORE INTO meta (key, value) SELECT 'post_count', COUNT(*) FROM posts;
+        CREATE TRIGGER IF NOT EXISTS trg_posts_count_ins AFTER INSERT ON posts BEGIN
+            UPDATE meta SET value = value + 1 WHERE key = 'post_count';
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_posts_count_del AFTER DELETE ON posts BEGIN
+            UPDATE meta SET value = value - 1 WHERE key = 'post_count';
+        END;
+
+        -- 업로드 파일(내용 주소)마다 그 파일을 쓰는 글 수. 0이 되면 행을 지움 -> collect_image가 파일 삭제
+        CREATE TABLE IF NOT EXISTS image_refs (
+            path TEXT PRIMARY KEY,
+            refs INTEGER NOT NULL
+        );
+        INSERT OR IGNORE INTO image_refs (path, refs)
+            SELECT image, COUNT(*) FROM posts WHERE image != '' GROUP BY image;
+        CREATE TRIGGER IF NOT EXISTS trg_image_refs_ins AFTER INSERT ON posts WHEN NEW.image != '' BEGIN
+            INSERT INTO image_refs (path, refs) VALUES (NEW.image, 1)
+                ON CONFLICT (path) DO UPDATE SET refs = refs + 1;
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_image_refs_upd AFTER UPDATE OF image ON posts
+            WHEN OLD.image IS NOT NEW.image BEGIN
+            UPDATE image_refs SET refs = refs - 1 WHERE path = OLD.image;
+            DELETE FROM image_refs WHERE path = OLD.image AND refs <= 0;
+            INSERT INTO image_refs (path, refs) SELECT NEW.image, 1 WHERE NEW.image != ''
+                ON CONFLICT (path) DO UPDATE SET refs = refs + 1;
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_image_refs_del AFTER DELETE ON posts WHEN OLD.image != '' BEGIN
+            UPDATE image_refs SET refs = refs - 1 WHERE path = OLD.image;
+            DELETE FROM image_refs WHERE path = OLD.image AND refs <= 0;
+        END;
+
+        -- 목록용 요약(comment_count, last_activity)을 댓글 추가/삭제 때 같이 갱신
+        -- 마지막 활동 = 작성/수정/댓글 시각 중 가장 늦은 것 (JSONL의 _summary_of와 같은 기준). 댓글을 지우면 남은 댓글로 다시 계산
+        CREATE TRIGGER IF NOT EXISTS trg_comments_count_ins AFTER INSERT ON comments BEGIN
+            UPDATE posts SET comment_count = comment_count + 1, last_activity = NEW.created_at
+            WHERE id = NEW.post_id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_comments_count_del AFTER DELETE ON comments BEGIN
+            UPDATE posts SET comment_count = comment_count - 1,
+                last_activity = max(created_at, edited_at, COALESCE(
+                    (SELECT MAX(created_at) FROM comments WHERE post_id = OLD.post_id), ''))
+            WHERE id = OLD.post_id;
+        END;
+
+        -- 글/댓글이 바뀔 때마다 1씩 증가하는 세대 번호 (HTTP ETag용)
+        INSERT OR IGNORE INTO meta (key, value) VALUES ('generation', 0);
+        CREATE TRIGGER IF NOT EXISTS trg_generation_posts_ins AFTER INSERT ON posts BEGIN
+            UPDATE meta SET value = value + 1 WHERE key = 'generation';
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_generation_posts_upd AFTER UPDATE ON posts BEGIN
+            UPDATE meta SET value = value + 1 WHERE key = 'generation';
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_generation_posts_del AFTER DELETE ON posts BEGIN
+            UPDATE meta SET value = value + 1 WHERE key = 'generation';
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_generation_comments_ins AFTER INSERT ON comments BEGIN
+            UPDATE meta SET value = value + 1 WHERE key = 'generation';
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_generation_comments_del AFTER DELETE ON comments BEGIN
+            UPDATE meta SET value = value + 1 WHERE key = 'generation';
+        END;
+    '''
+
+    # 💜 전문 검색(FTS5): posts_fts의 rowid = 글 id. 제목/본문/댓글(줄바꿈으로 이어 붙임)을 색인
+    # - posts/comments가 바뀔 때 트리거로 같이 갱신 -> 검색은 인덱스 조회 + bm25 순위 + snippet 발췌
+    # - 토크나이저: trigram(SQLite 3.34+, 한글처럼 띄어쓰기로 안 나뉘는 글도 부분 문자열로 찾음)
+    #   없으면 unicode61(단어 단위), FTS5 자체가 없으면 LIKE 검색만 사용
+    # - trigram은 3글자 미만 단어를 못 찾으므로 bigram 색인(posts_bigram)을 하나 더 둠
+    #   같은 제목/본문/댓글을 _bigram_text()로 펼친 문자열을 unicode61로 색인 -> 2글자 단어는 토큰 그대로 조회
+    #   트리거가 파이썬 함수 bigrams()를 쓰므로 이 DB에 쓰는 연결은 _conn()처럼 함수를 등록해야 함
+    FTS_TRIGGERS = '''
+        CREATE TRIGGER IF NOT EXISTS trg_posts_fts_ins AFTER INSERT ON posts BEGIN
+            INSERT INTO posts_fts (rowid, title, content, comments) VALUES (NEW.id, NEW.title, NEW.content, '');
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_posts_fts_upd AFTER UPDATE OF title, content ON posts BEGIN
+            UPDATE posts_fts SET title = NEW.title, content = NEW.content WHERE rowid = NEW.id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_posts_fts_del AFTER DELETE ON posts BEGIN
+            DELETE FROM posts_fts WHERE rowid = OLD.id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_comments_fts_ins AFTER INSERT ON comments BEGIN
+            UPDATE posts_fts SET comments = (SELECT group_concat(text, char(10)) FROM comments
+                                             WHERE post_id = NEW.post_id) WHERE rowid = NEW.post_id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_comments_fts_del AFTER DELETE ON comments BEGIN
+            UPDATE posts_fts SET comments = COALESCE((SELECT group_concat(text, char(10)) FROM comments
+                                                      WHERE post_id = OLD.post_id), '') WHERE rowid = OLD.post_id;
+        END;
+    '''
+    BIGRAM_TRIGGERS = '''
+        CREATE TRIGGER IF NOT EXISTS trg_posts_bigram_ins AFTER INSERT ON posts BEGIN
+            INSERT INTO posts_bigram (rowid, title, content, comments)
+            VALUES (NEW.id, bigrams(NEW.title), bigrams(NEW.content), '');
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_posts_bigram_upd AFTER UPDATE OF title, content ON posts BEGIN
+            UPDATE posts_bigram SET title = bigrams(NEW.title), content = bigrams(NEW.content) WHERE rowid = NEW.id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_posts_bigram_del AFTER DELETE ON posts BEGIN
+            DELETE FROM posts_bigram WHERE rowid = OLD.id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_comments_bigram_ins AFTER INSERT ON comments BEGIN
+            UPDATE posts_bigram SET comments = bigrams((SELECT group_concat(text, char(10)) FROM comments
+                                                        WHERE post_id = NEW.post_id)) WHERE rowid = NEW.post_id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_comments_bigram_del AFTER DELETE ON comments BEGIN
+            UPDATE posts_bigram SET comments = bigrams((SELECT group_concat(text, char(10)) FROM comments
+                                                        WHERE post_id = OLD.post_id)) WHERE rowid = OLD.post_id;
+        END;
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.executescript(self.SCHEMA)
+            self.fts_tokenizer = self._create_fts(conn)
+            self.fts_bigram = self.fts_tokenizer == 'trigram' and self._create_bigram_fts(conn)
+
+    @classmethod
+    def _create_fts(cls, conn):
+        # posts_fts가 없으면 만들고 기존 글/댓글로 채움. 사용 중인 토크나이저 이름 반환 (FTS5가 없으면 None)
+        row = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'posts_fts'").fetchone()
+        if row is None:
+            for tokenizer in ('trigram', 'unicode61'):
+                try:
+                    conn.execute(f"CREATE VIRTUAL TABLE posts_fts USING fts5(title, content, comments, "
+                                 f"tokenize='{tokenizer}')")
+                    break
+                except sqlite3.OperationalError:
+                    continue
+            else:
+                return None
+            conn.execute('''INSERT INTO posts_fts (rowid, title, content, comments)
+                            SELECT id, title, content, COALESCE((SELECT group_concat(text, char(10)) FROM comments
+                                                                 WHERE post_id = posts.id), '') FROM posts''')
+        else:
+            tokenizer = 'trigram' if 'trigram' in row['sql'] else 'unicode61'
+        conn.executescript(cls.FTS_TRIGGERS)
+        return tokenizer
+
+    @classmethod
+    def _create_bigram_fts(cls, conn):
+        # posts_bigram이 없으면 만들고 기존 글/댓글로 채움 (예전 DB도 처음 열 때 한 번)
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'posts_bigram'").fetchone() is None:
+            try:
+                conn.execute("CREATE VIRTUAL TABLE posts_bigram USING fts5(title, content, comments, "
+                             "tokenize='unicode61')")
+            except sqlite3.OperationalError:
+                return False
+            conn.execute('''INSERT INTO posts_bigram (rowid, title, content, comments)
+                            SELECT id, bigrams(title), bigrams(content),
+                                   bigrams((SELECT group_concat(text, char(10)) FROM comments
+                                            WHERE post_id = posts.id)) FROM posts''')
+        conn.executescript(cls.BIGRAM_TRIGGERS)
+        return True
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL') # 읽기와 쓰기가 서로 막지 않음
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA foreign_keys=ON')
+            conn.create_function('bigrams', 1, _bigram_text, deterministic=True) # posts_bigram 트리거용
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _comment(row):
+        return Comment(row['text'], row['created_at'])
+
+    def _posts_with_comments(self, conn, rows):
+        # 글 행 목록 + 그 글들의 댓글을 한 번의 쿼리로 붙여서 Post 목록으로
+        comments = {}
+        if rows:
+            marks = ','.join('?' * len(rows))
+            for row in conn.execute(f'SELECT post_id, text, created_at FROM comments '
+                                    f'WHERE post_id IN ({marks}) ORDER BY post_id, id',
+                                    [r['id'] for r in rows]):
+                comments.setdefault(row['post_id'], []).append(self._comment(row))
+        return [Post(r['id'], r['title'], r['content'], r['image'], r['created_at'], comments.get(r['id'], []),
+                     json.loads(r['image_variants']) if r['image_variants'] else None)
+                for r in rows]
+
+    # iter_posts(fields=...)에서 댓글 없이 바로 읽을 수 있는 컬럼
+    _COLUMNS = ('id', 'title', 'content', 'image', 'created_at', 'comment_count', 'last_activity')
+
+    def load_posts(self):
+        return list(self.iter_posts())
+
+    def iter_posts(self, start=0, limit=None, fields=None):
+        # 200개씩 가져와서 그 글들의 댓글을 한 번에 붙여 하나씩 내보냄
+        if start < 0 or (limit is not None and limit <= 0):
+            return
+        conn = self._conn()
+        light = fields is not None and set(fields) <= set(self._COLUMNS)
+        # 댓글이 필요 없으면 필요한 컬럼만 읽음 (comment_count/last_activity는 posts 테이블에 있음)
+        columns = ', '.join(c for c in self._COLUMNS if c in fields) if light else \
+            'id, title, content, image, image_variants, created_at'
+        cur = conn.execute(f'SELECT {columns} FROM posts '
+                           'ORDER BY id LIMIT ? OFFSET ?', (-1 if limit is None else limit, start))
+        while True:
+            rows = cur.fetchmany(200)
+            if not rows:
+                return
+            if light:
+                posts = [dict(r) for r in rows]
+            else:
+                posts = self._posts_with_comments(conn, rows)
+            for post in posts:
+                yield _project(post, fields)
+
+    def load_post(self, post_id):
+        conn = self._conn()
+        row = conn.execute('SELECT id, title, content, image, image_variants, created_at FROM posts WHERE id = ?',
+                           (post_id,)).fetchone()
+        if row is None:
+            return None
+        return self._posts_with_comments(conn, [row])[0]
+
+    def count_posts(self):
+        row = self._conn().execute("SELECT value FROM meta WHERE key = 'post_count'").fetchone()
+        return row[0] if row else 0
+
+    def list_posts(self, start, limit):
+        return list(self.iter_posts(start, limit))
+
+    def list_posts_after(self, post_id, limit):
+        conn = self._conn()
+        rows = conn.execute('SELECT id, title, content, image, image_variants, created_at FROM posts '
+                            'WHERE id > ? ORDER BY id LIMIT ?', (post_id, limit)).fetchall()
+        return self._posts_with_comments(conn, rows)
+
+    def list_summaries(self, start, limit):
+        if start < 0 or limit <= 0:
+            return []
+        rows = self._conn().execute('SELECT id, title, comment_count, last_activity FROM posts '
+                                    'ORDER BY id LIMIT ? OFFSET ?', (limit, start))
+        return [dict(r) for r in rows]
+
+    def list_summaries_after(self, post_id, limit):
+        rows = self._conn().execute('SELECT id, title, comment_count, last_activity FROM posts '
+                                    'WHERE id > ? ORDER BY id LIMIT ?', (post_id, limit))
+        return [dict(r) for r in rows]
+
+    def search(self, query, limit):
+        # FTS5: 단어를 모두 포함하는 글, bm25 순위(제목 가중치 10) + 본문/댓글 발췌
+        # trigram은 3글자 미만 단어를 찾지 못하므로 2글자 단어는 posts_bigram에서, 1글자 단어가 있으면 LIKE 스캔으로
+        words = _WORD_RE.findall(query)
+        if not words:
+            return 0, []
+        short = [w for w in words if len(w) == 2] if self.fts_bigram else []
+        long = [w for w in words if w not in short]
+        if self.fts_tokenizer is None or (self.fts_tokenizer == 'trigram' and any(len(w) < 3 for w in long)):
+            return self._search_like(query, limit)
+        conn = self._conn()
+        # 긴 단어가 있으면 posts_fts로 순위/발췌, 2글자 단어는 posts_bigram의 rowid로 거름
+        # 2글자 단어뿐이면 posts_bigram으로 순위를 매기고 발췌는 본문에서 직접 (bigram 문자열은 읽을 수 없으므로)
+        table = 'posts_fts' if long else 'posts_bigram'
+        where, params = [], []
+        if long:
+            where.append('posts_fts MATCH ?')
+            params.append(self._match(long))
+        if short:
+            where.append('posts_bigram MATCH ?' if not long else
+                         'posts_fts.rowid IN (SELECT rowid FROM posts_bigram WHERE posts_bigram MATCH ?)')
+            params.append(self._match(w.lower() for w in short))
+        where = ' AND '.join(where)
+        total = conn.execute(f'SELECT COUNT(*) FROM {table} WHERE {where}', params).fetchone()[0]
+        snippet = "snippet(posts_fts, -1, char(2), char(3), '…', 16)" if long else 'p.content'
+        rows = conn.execute(f'''SELECT p.id, p.title, p.comment_count, p.last_activity, {snippet} AS snippet
+                                FROM {table} JOIN posts p ON p.id = {table}.rowid
+                                WHERE {where} ORDER BY bm25({table}, 10.0, 1.0, 1.0) LIMIT ?''',
+                             params + [max(limit, 0)])
+        return total, [{**dict(r), 'snippet': self._mark(r['snippet'] if long else
+                                                         self._snippet(r['snippet'], short))} for r in rows]
+
+    @staticmethod
+    def _match(words):
+        # 단어마다 따옴표로 감싼 구(phrase)를 AND로 (FTS5 문법 문자가 섞여도 글자 그대로)
+        return ' '.join('"' + w.replace('"', '""') + '"' for w in words)
+
+    @staticmethod
+    def _snippet(text, words, width=40):
+        # 본문에서 처음 나오는 검색어 주변 width글자씩을 잘라 검색어를 제어 문자로 감쌈 (FTS5 snippet()과 같은 표시)
+        pattern = re.compile('|'.join(map(re.escape, words)), re.IGNORECASE)
+        found = pattern.search(text)
+        if found is None:
+            return ''
+        start, end = max(found.start() - width, 0), found.end() + width
+        piece = pattern.sub(lambda m: f'\x02{m.group()}\x03', text[start:end])
+        return ('…' if start else '') + piece + ('…' if end < len(text) else '')
+
+    @staticmethod
+    def _mark(snippet):
+        # 발췌의 강조 표시는 제어 문자로 받아서, 나머지를 이스케이프한 뒤에 <mark>로 바꿈 (글 내용의 HTML은 그대로 글자로)
+        return Markup(str(escape(snippet)).replace('\x02', '<mark>').replace('\x03', '</mark>'))
+
+    def cache_version(self, post_id=None):
+        # 세대 번호(전체 기준). 마지막 수정 시각은 DB/WAL 파일 mtime
+        conn = self._conn()
+        if post_id is not None and conn.execute('SELECT 1 FROM posts WHERE id = ?', (post_id,)).fetchone() is None:
+            return None, None
+        generation = conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()[0]
+        mtimes = [os.path.getmtime(p) for p in (self.path, f"{self.path}-wal") if os.path.exists(p)]
+        return str(generation), max(mtimes, default=None)
+
+    def _search_like(self, query, limit):
+        # 단어마다 제목/본문/댓글 중 하나에 들어 있는 글 (LIKE: 전체 스캔)
+        words = _WORD_RE.findall(query.lower())
+        if not words:
+            return 0, []
+        # \w+ 단어라서 LIKE 특수문자 중에는 '_'만 이스케이프하면 됨 (LIKE는 ASCII 대소문자를 구분하지 않음)
+        clause = ("(title LIKE ? ESCAPE '\\' OR content LIKE ? ESCAPE '\\' OR EXISTS "
+                  "(SELECT 1 FROM comments c WHERE c.post_id = posts.id AND c.text LIKE ? ESCAPE '\\'))")
+        where = ' AND '.join([clause] * len(words))
+        params = [like for w in words for like in ['%' + w.replace('_', '\\_') + '%'] * 3]
+        conn = self._conn()
+        total = conn.execute(f'SELECT COUNT(*) FROM posts WHERE {where}', params).fetchone()[0]
+        rows = conn.execute(f'SELECT id, title, comment_count, last_activity FROM posts WHERE {where} '
+                            'ORDER BY id DESC LIMIT ?', params + [max(limit, 0)])
+        return total, [dict(r) for r in rows]
+
+    def save_post(self, title, content, image=''):
+        now = datetime.now().isoformat(timespec='seconds')
+        with self._conn() as conn:
+            cur = conn.execute('INSERT INTO posts (title, content, image, created_at, last_activity) '
+                               'VALUES (?, ?, ?, ?, ?)', (title, content, image, now, now))
+            return cur.lastrowid
+
+    def edit_post(self, post_id, title, content, image=None):
+        now = datetime.now().isoformat(timespec='seconds')
+        with self._conn() as conn:
+            old = conn.execute('SELECT image FROM posts WHERE id = ?', (post_id,)).fetchone()
+            # 이미지를 바꾸면 옛 썸네일 목록은 비움
+            conn.execute('UPDATE posts SET title = ?, content = ?, image = COALESCE(?, image), '
+                         "image_variants = CASE WHEN ? IS NULL THEN image_variants ELSE '' END, "
+                         'edited_at = ?, last_activity = ? WHERE id = ?',
+                         (title, content, image, image, now, now, post_id))
+        if old is None:
+            return False
+        if image is not None and image != old['image']:
+            collect_image(self, old['image'])
+        return True
+
+    def set_image_variants(self, post_id, image, variants):
+        with self._conn() as conn:
+            cur = conn.execute('UPDATE posts SET image_variants = ? WHERE id = ? AND image = ?',
+                               (json.dumps(variants), post_id, image))
+            return cur.rowcount > 0
+
+    def image_refs(self, image):
+        row = self._conn().execute('SELECT refs FROM image_refs WHERE path = ?', (image,)).fetchone()
+        return row[0] if row else 0
+
+    def delete_post(self, post_id):
+        with self._conn() as conn:
+            row = conn.execute('SELECT image FROM posts WHERE id = ?', (post_id,)).fetchone()
+            conn.execute('DELETE FROM posts WHERE id = ?', (post_id,)) # 댓글은 ON DELETE CASCADE
+        if row is None:
+            return False
+        collect_image(self, row['image'])
+        return True
+
+    def add_comment(self, post_id, text):
+        if not text:
+            return False
+        with self._conn() as conn:
+            if conn.execute('SELECT 1 FROM posts WHERE id = ?', (post_id,)).fetchone() is None:
+                return False
+            conn.execute('INSERT INTO comments (post_id, text, created_at) VALUES (?, ?, ?)',
+                         (post_id, text, datetime.now().isoformat(timespec='seconds')))
+            return True
+
+    def delete_comment(self, post_id, cidx):
+        # cidx: 그 글의 몇 번째 댓글인지 (post_id, id 인덱스로 찾음)
+        if cidx < 0:
+            return True
+        with self._conn() as conn:
+            row = conn.execute('SELECT id FROM comments WHERE post_id = ? ORDER BY id LIMIT 1 OFFSET ?',
+                               (post_id, cidx)).fetchone()
+            if row is not None:
+                conn.execute('DELETE FROM comments WHERE id = ?', (row['id'],))
+        return True
+
+    def stats(self):
+        conn = self._conn()
+        return {
+            'posts': self.count_posts(),
+            'comments': conn.execute('SELECT COUNT(*) FROM comments').fetchone()[0],
+            'fts_tokenizer': self.fts_tokenizer,
+            'fts_bigram': self.fts_bigram,
+        }
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_store():
+    # 설정값(POST_STORE)에 맞는 저장소 객체 (프로세스당 하나)
+    name = app.config['POST_STORE']
+    with _stores_lock:
+        if name not in _stores:
+            if name == 'jsonl':
+                _stores[name] = JsonlPostStore()
+            elif name == 'sqlite':
+                _stores[name] = SqlitePostStore(app.config['SQLITE_PATH'])
+            else:
+                raise ValueError(f"unknown POST_STORE: {name!r}")
+        return _stores[name]
+
+@app.cli.command('import-posts')
+def import_posts_command():
+    """posts.txt 의 글/댓글을 SQLite 저장소(SQLITE_PATH)로 복사한다."""
+    target = SqlitePostStore(app.config['SQLITE_PATH'])
+    if target.stats()['posts']:
+        print("SQLite store is not empty; aborting")
+        return
+    count = 0
+    with target._conn() as conn:
+        for p in iter_posts(): # 한 건씩 읽어서 바로 INSERT (전체를 메모리에 올리지 않음)
+            count += 1
+            # 글 id를 그대로 유지해서 옮김 (기존 URL이 계속 동작하도록)
+            conn.execute('INSERT INTO posts (id, title, content, image, image_variants, created_at, last_activity) '
+                         'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                         (p.id, p.title, p.content, p.image, json.dumps(p.image_variants) if p.image_variants else '',
+                          p.created_at, _summary_of(p)['last_activity']))
+            conn.executemany('INSERT INTO comments (post_id, text, created_at) VALUES (?, ?, ?)',
+                             [(p.id, c.text, c.created_at) for c in p.comments])
+    print(f"imported {count} posts into {app.config['SQLITE_PATH']}")
+
+# 💜 템플릿: 라우트마다 render_template_string()에 넘기던 HTML을 이름 붙인 템플릿으로 등록
+# - render_template_string()은 요청마다 템플릿 소스를 다시 컴파일(env.from_string)함
+# - DictLoader에 등록하면 Jinja가 처음 한 번만 컴파일하고 캐시해서 재사용 -> render_template('이름')
+# - JINJA_BYTECODE_CACHE_DIR 설정 시 컴파일 결과를 디스크에도 저장 (재시작 후 첫 요청도 컴파일 생략)
+# - 성능 비교: flask --app app bench-render
+TEMPLATES = {}
+app.jinja_loader = ChoiceLoader([DictLoader(TEMPLATES), app.jinja_loader])
+app.config.setdefault('JINJA_BYTECODE_CACHE_DIR', os.environ.get('JINJA_BYTECODE_CACHE_DIR'))
+if app.config['JINJA_BYTECODE_CACHE_DIR']:
+    os.makedirs(app.config['JINJA_BYTECODE_CACHE_DIR'], exist_ok=True)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(app.config['JINJA_BYTECODE_CACHE_DIR'])
+
 # 홈 주소 / -> 게시판으로 리다이렉트
 @app.route('/')
 def home():
     # 하드코딩('/board') 대신 url_for 사용 -> 경로/오타에 강함
     return redirect(url_for('board')) # 글 목록 페이지로 이동
 
-# 게시판 목록페이지 /board
-@app.route('/board')
-def board():
-    posts = load_posts() # 파일에서 글 목록 불러오기
-    return render_template_string('''
+TEMPLATES['board.html'] = '''
         <h2>📝 나의 게시판</h2>
         <a href = {{ url_for('create') }}>글쓰기</a>
+        <form action="{{ url_for('search') }}" method="get" style="display:inline;">
+            <input type="search" name="q" placeholder="검색"> <button type="submit">🔍</button>
+        </form>
         <ul>
         {% for post in posts %}
             <li>
-                <a href="{{ url_for('detail', index=loop.index0) }}">{{ post.title }}</a>
+                <a href="{{ url_for('detail', post_id=post.id) }}">{{ post.title }}</a>
                 <small style = "color:#888;">
-                    (댓글 {{ post.comments|length if post.comments is defined else 0 }})
+                    (댓글 {{ post.comment_count }}{% if post.last_activity %} · {{ post.last_activity }}{% endif %})
                 </small>
             </li> 
         {% endfor %}
-        </ul>                                  
-''', posts=posts) # 글 목록을 템플릿에 넘겨줌
-# ✅ render_template_string() : HTML을 직접 문자열로 사용
+        </ul>
+        <p>
+            {% if page is none %}
+                <a href="{{ url_for('board', per_page=per_page) }}">◀ 처음으로</a>
+            {% elif page > 1 %}
+                <a href="{{ url_for('board', page=page - 1, per_page=per_page) }}">◀ 이전</a>
+            {% endif %}
+            <span>{% if page is not none %}{{ page }} / {{ pages }} {% endif %}(전체 {{ total }}개)</span>
+            {% if has_next %}
+                <a href="{{ url_for('board', after=posts[-1].id, per_page=per_page) }}">다음 ▶</a>
+            {% endif %}
+        </p>
+'''
+
+# 💜 HTTP 캐시 검증: ETag / Last-Modified를 붙이고, 브라우저·프록시가 가진 페이지가 최신이면 304 (렌더링 생략)
+# - ETag = 저장소의 cache_version() + 템플릿 내용의 해시 (템플릿을 고쳐 배포하면 ETag도 바뀜)
+# - 버전은 페이지를 읽기 "전에" 구함: 읽은 뒤에 구하면 옛 내용에 새 ETag가 붙어서 계속 304가 나갈 수 있음
+# - Cache-Control: no-cache -> 캐시는 해도 매번 재검증 (Last-Modified만 보고 추측해서 재사용하지 않게)
+# - 방금(1초 안에) 바뀐 파일은 Last-Modified를 보내지 않음: 초 단위라 같은 초 안의 다음 변경을 구분 못 함
+_page_salt = {'value': None}
+
+def _etag_for(version):
+    if _page_salt['value'] is None:
+        sources = ''.join(f"{name}\0{TEMPLATES[name]}" for name in sorted(TEMPLATES))
+        _page_salt['value'] = hashlib.sha1(sources.encode('utf-8')).hexdigest()[:8]
+    data = f"{_page_salt['value']}|{app.config['POST_STORE']}|{version}".encode('utf-8')
+    return hashlib.sha1(data).hexdigest()[:20]
+
+def _not_modified(version, last_modified):
+    # 요청의 If-None-Match / If-Modified-Since가 지금 버전과 맞으면 304 응답, 아니면 None
+    etag = _etag_for(version)
+    if request.if_none_match:
+        fresh = request.if_none_match.contains_weak(etag) # If-None-Match가 있으면 If-Modified-Since는 무시
+    elif request.if_modified_since and last_modified is not None and time.time() - last_modified >= 1:
+        fresh = int(last_modified) <= request.if_modified_since.timestamp()
+    else:
+        fresh = False
+    return _with_validators(make_response('', 304), version, last_modified) if fresh else None
+
+def _with_validators(response, version, last_modified):
+    response = make_response(response)
+    response.set_etag(_etag_for(version))
+    if last_modified is not None and time.time() - last_modified >= 1:
+        response.last_modified = int(last_modified)
+    response.cache_control.no_cache = True
+    return response
+
+# 💜 렌더링된 페이지 캐시: 같은 목록/상세 페이지를 다시 렌더링하지 않음
+# - 키: ('board', page, per_page, after) / ('post', 글 id) -> 값: (ETag, HTML)
+#   ETag(= 데이터 버전)가 지금과 같을 때만 적중 -> 다른 워커가 쓴 글도 버전이 바뀌어서 옛 HTML을 내보내지 않음
+# - 쓰기 라우트는 영향받는 페이지만 바로 지움 (글 추가: 목록 / 수정·삭제·댓글: 목록 + 그 글)
+# - 개수(PAGE_CACHE_SIZE)와 HTML 총 길이(PAGE_CACHE_MAX_CHARS) 둘 다 넘지 않게, 가장 오래 안 쓴 것부터 버림
+# - 저장 위치(PAGE_CACHE_BACKEND)
+#   memory: 프로세스 메모리 LRU (기본값). 워커마다 따로 데움
+#   disk:   PAGE_CACHE_DIR 디렉터리에 페이지당 파일 하나 -> 같은 호스트의 모든 워커가 공유, 재시작해도 남음
+#   sqlite: PAGE_CACHE_SQLITE 파일의 테이블 하나 -> 공유 + 지우기/정리가 쿼리 한 번
+#   공유 캐시의 지우기는 모든 워커에 바로 보임. 다른 워커가 못 지운 경우도 세대 번호(posts.txt.gen)가 ETag에 들어가 있어 적중하지 않음
+# - 적중률은 /metrics 의 page_cache (적중/실패 횟수는 프로세스별, 개수/크기는 저장소 기준)
+# - 공유 캐시는 적중할 때 "마지막 사용 시각"을 PAGE_CACHE_TOUCH_INTERVAL초에 한 번만 갱신
+#   -> 자주 읽히는 페이지의 적중은 읽기만 (워커끼리 쓰기 락/WAL 쓰기를 다투지 않음). LRU 순서는 그만큼 대략적
+app.config.setdefault('PAGE_CACHE_SIZE', 512)
+app.config.setdefault('PAGE_CACHE_MAX_CHARS', 16 * 1024 * 1024)
+app.config.setdefault('PAGE_CACHE_BACKEND', os.environ.get('PAGE_CACHE_BACKEND', 'memory'))
+app.config.setdefault('PAGE_CACHE_DIR', 'page_cache')
+app.config.setdefault('PAGE_CACHE_SQLITE', 'page_cache.db')
+app.config.setdefault('PAGE_CACHE_TOUCH_INTERVAL', 60)
+
+class MemoryPageCache:
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._chars = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, etag, html):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._chars -= len(old[1])
+            self._entries[key] = (etag, html)
+            self._chars += len(html)
+            while len(self._entries) > app.config['PAGE_CACHE_SIZE'] or self._chars > app.config['PAGE_CACHE_MAX_CHARS']:
+                _, (_, dropped) = self._entries.popitem(last=False)
+                self._chars -= len(dropped)
+                self.evictions += 1
+
+    def invalidate(self, post_id=None):
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == 'board' or k == ('post', post_id)]:
+                self._chars -= len(self._entries.pop(key)[1])
+                self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'chars': self._chars,
+                    'evictions': self.evictions, 'invalidations': self.invalidations}
+
+class DiskPageCache:
+    # 파일 이름: post-<id> / board-<키 해시>. 내용: 'ETag\n' + HTML(utf-8)
+    # - 임시 파일에 쓰고 os.replace() -> 읽는 워커는 반쯤 쓴 파일을 보지 않음
+    # - 읽을 때 mtime을 갱신(LRU), 한도를 넘으면 mtime이 오래된 파일부터 지움
+    # - 한도 확인은 디렉터리를 훑어야 해서 PRUNE_EVERY번 저장마다 한 번
+    PRUNE_EVERY = 32
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._sets = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _file(self, key):
+        if key[0] == 'post':
+            return os.path.join(self.path, f"post-{int(key[1])}")
+        return os.path.join(self.path, f"{key[0]}-{hashlib.sha1(repr(key).encode('utf-8')).hexdigest()[:16]}")
+
+    def get(self, key):
+        path = self._file(key)
+        try:
+            with open(path, 'rb') as f:
+                etag = f.readline().rstrip(b'\n').decode('ascii')
+                html = f.read().decode('utf-8')
+                used_at = os.fstat(f.fileno()).st_mtime
+            if time.time() - used_at > app.config['PAGE_CACHE_TOUCH_INTERVAL']:
+                os.utime(path)
+        except (FileNotFoundError, UnicodeDecodeError):
+            return None
+        return etag, html
+
+    def set(self, key, etag, html):
+        path = self._file(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(etag.encode('ascii') + b'\n' + html.encode('utf-8'))
+        try:
+            os.replace(tmp, path)
+        except FileNotFoundError:
+            return # 다른 워커가 디렉터리를 비웠음. 캐시 저장 실패로 읽기 요청이 실패하면 안 됨
+        self._sets += 1
+        if self._sets % self.PRUNE_EVERY == 0:
+            self._prune()
+
+    def _entries(self):
+        # (mtime, 크기, 경로) 목록. 다른 워커가 동시에 지운 파일은 건너뜀
+        entries = []
+        with os.scandir(self.path) as it:
+            for entry in it:
+                if entry.name.endswith('.tmp'):
+                    continue
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, entry.path))
+        return entries
+
+    def _prune(self):
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        while entries and (len(entries) > app.config['PAGE_CACHE_SIZE'] or total > app.config['PAGE_CACHE_MAX_CHARS']):
+            _, size, path = entries.pop(0)
+            total -= size
+            try:
+                os.remove(path)
+                self.evictions += 1
+            except FileNotFoundError:
+                pass
+
+    def invalidate(self, post_id=None):
+        with os.scandir(self.path) as it:
+            names = [entry.name for entry in it]
+        for name in names:
+            if name.endswith('.tmp'):
+                continue # 다른 워커가 쓰는 중인 파일 (set이 곧 이름을 바꿈)
+            if name.startswith('board-') or name == f"post-{post_id}":
+                try:
+                    os.remove(os.path.join(self.path, name))
+                    self.invalidations += 1
+                except FileNotFoundError:
+                    pass
+
+    def stats(self):
+        entries = self._entries()
+        return {'entries': len(entries), 'bytes': sum(size for _, size, _ in entries),
+                'evictions': self.evictions, 'invalidations': self.invalidations}
+
+class SqlitePageCache:
+    # 테이블 하나: kind('board'/'post'), key(repr), etag, html, used_at
+    # - WAL이라 여러 워커가 동시에 읽어도 서로 막지 않음
+    # - 한도 정리는 DiskPageCache와 같이 PRUNE_EVERY번 저장마다 한 번
+    PRUNE_EVERY = 32
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS pages (
+            key     TEXT PRIMARY KEY,
+            kind    TEXT NOT NULL,
+            etag    TEXT NOT NULL,
+            html    TEXT NOT NULL,
+            used_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS pages_used_at ON pages (used_at);
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._sets = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._conn().executescript(self.SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None) # 문장마다 바로 커밋
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF') # 캐시라서 잃어도 다시 렌더링하면 됨
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        conn = self._conn()
+        row = conn.execute('SELECT etag, html, used_at FROM pages WHERE key = ?', (repr(key),)).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        if now - row[2] > app.config['PAGE_CACHE_TOUCH_INTERVAL']:
+            conn.execute('UPDATE pages SET used_at = ? WHERE key = ?', (now, repr(key)))
+        return row[:2]
+
+    def set(self, key, etag, html):
+        conn = self._conn()
+        conn.execute('INSERT OR REPLACE INTO pages (key, kind, etag, html, used_at) VALUES (?, ?, ?, ?, ?)',
+                     (repr(key), key[0], etag, html, time.time()))
+        self._sets += 1
+        if self._sets % self.PRUNE_EVERY == 0:
+            self._prune(conn)
+
+    def _prune(self, conn):
+        # 개수 한도를 넘는 만큼 오래된 것부터, 그 다음 크기 한도를 넘는 만큼 오래된 것부터
+        cur = conn.execute('''DELETE FROM pages WHERE key IN (
+                                  SELECT key FROM pages ORDER BY used_at DESC LIMIT -1 OFFSET ?)''',
+                           (app.config['PAGE_CACHE_SIZE'],))
+        self.evictions += cur.rowcount
+        cur = conn.execute('''DELETE FROM pages WHERE key IN (
+                                  SELECT key FROM (SELECT key, SUM(length(html)) OVER (ORDER BY used_at DESC) AS running
+                                                   FROM pages) WHERE running > ?)''',
+                           (app.config['PAGE_CACHE_MAX_CHARS'],))
+        self.evictions += cur.rowcount
+
+    def invalidate(self, post_id=None):
+        cur = self._conn().execute("DELETE FROM pages WHERE kind = 'board' OR key = ?", (repr(('post', post_id)),))
+        self.invalidations += cur.rowcount
+
+    def stats(self):
+        entries, chars = self._conn().execute('SELECT COUNT(*), COALESCE(SUM(length(html)), 0) FROM pages').fetchone()
+        return {'entries': entries, 'chars': chars, 'evictions': self.evictions, 'invalidations': self.invalidations}
+
+_page_caches = {}
+_page_caches_lock = threading.Lock()
+_page_cache = {'hits': 0, 'misses': 0}
+_page_cache_lock = threading.Lock()
+
+def get_page_cache():
+    # 설정값(PAGE_CACHE_BACKEND)에 맞는 페이지 캐시 객체 (프로세스당 하나)
+    name = app.config['PAGE_CACHE_BACKEND']
+    with _page_caches_lock:
+        if name not in _page_caches:
+            if name == 'memory':
+                _page_caches[name] = MemoryPageCache()
+            elif name == 'disk':
+                _page_caches[name] = DiskPageCache(app.config['PAGE_CACHE_DIR'])
+            elif name == 'sqlite':
+                _page_caches[name] = SqlitePageCache(app.config['PAGE_CACHE_SQLITE'])
+            else:
+                raise ValueError(f"unknown PAGE_CACHE_BACKEND: {name!r}")
+        return _page_caches[name]
+
+def _cached_page(key, etag):
+    entry = get_page_cache().get(key)
+    hit = entry is not None and entry[0] == etag
+    with _page_cache_lock:
+        _page_cache['hits' if hit else 'misses'] += 1
+    return entry[1] if hit else None
+
+def _store_page(key, etag, html):
+    if len(html) > app.config['PAGE_CACHE_MAX_CHARS']:
+        return
+    get_page_cache().set(key, etag, html)
+
+def _invalidate_pages(post_id=None):
+    # 목록 페이지 전부 + (post_id가 있으면) 그 글의 상세 페이지
+    get_page_cache().invalidate(post_id)
+
+def page_cache_stats():
+    with _page_cache_lock:
+        hits, misses = _page_cache['hits'], _page_cache['misses']
+    return {'backend': app.config['PAGE_CACHE_BACKEND'], **get_page_cache().stats(), 'hits': hits, 'misses': misses,
+            'hit_rate': hits / (hits + misses) if hits + misses else 0.0}
+
+# 게시판 목록페이지 /board
+# - ?page=2&per_page=20 : 페이지 번호 방식
+# - ?after=39           : 커서 방식 (id가 39인 글 다음부터). 다음 페이지 링크는 이 방식을 사용
+# - 전체 목록을 만들지 않고 현재 페이지 글만 읽음
+BOARD_PER_PAGE = 20
+BOARD_MAX_PER_PAGE = 100
+
+@app.route('/board')
+def board():
+    store = get_store()
+    version, last_modified = store.cache_version()
+    not_modified = _not_modified(version, last_modified)
+    if not_modified is not None:
+        return not_modified
+    per_page = min(max(request.args.get('per_page', BOARD_PER_PAGE, type=int), 1), BOARD_MAX_PER_PAGE)
+    after = request.args.get('after', type=int)
+    page = None if after is not None else max(request.args.get('page', 1, type=int), 1) # 커서 방식은 몇 번째 페이지인지 세지 않음
+    key, etag = ('board', page, per_page, after), _etag_for(version)
+    html = _cached_page(key, etag)
+    if html is None:
+        total = store.count_posts()
+        # 현재 페이지 글만 불러오기 (다음 페이지가 있는지 알기 위해 1개 더)
+        # 목록에는 요약(id, 제목, 댓글 수, 마지막 활동)만 필요 -> 본문/댓글은 읽지 않음
+        if after is not None:
+            posts = store.list_summaries_after(after, per_page + 1)
+        else:
+            posts = store.list_summaries((page - 1) * per_page, per_page + 1)
+        has_next = len(posts) > per_page
+        posts = posts[:per_page]
+        pages = max((total + per_page - 1) // per_page, 1)
+        html = render_template('board.html', posts=posts, page=page, pages=pages, total=total,
+                               per_page=per_page, has_next=has_next) # 현재 페이지 글 목록을 템플릿에 넘겨줌
+        _store_page(key, etag, html)
+    return _with_validators(html, version, last_modified)
+# ✅ render_template() : 위에서 등록한 템플릿(TEMPLATES)을 이름으로 사용
 # ✅ {% for %}: Jinja 템플릿 반복문
 # ✅ {{ post }}: 반복되는 글 내용 출력
 
 
+TEMPLATES['search.html'] = '''
+        <h2>🔍 검색</h2>
+        <form action="{{ url_for('search') }}" method="get">
+            <input type="search" name="q" value="{{ q }}" required> <button type="submit">검색</button>
+        </form>
+        {% if q %}
+            <p>"{{ q }}" 검색 결과 {{ total }}개{% if total > posts|length %} (상위 {{ posts|length }}개){% endif %}</p>
+            <ul>
+            {% for post in posts %}
+                <li>
+                    <a href="{{ url_for('detail', post_id=post.id) }}">{{ post.title }}</a>
+                    <small style = "color:#888;">(댓글 {{ post.comment_count }})</small>
+                    {% if post.snippet %}<br><small>{{ post.snippet }}</small>{% endif %}
+                </li>
+            {% endfor %}
+            </ul>
+        {% endif %}
+        <p><a href = "{{ url_for('board') }}">목록으로</a></p>
+'''
+
+# 💜 검색 /search?q=검색어
+# - jsonl: 메모리의 역색인(bigram)으로 찾음 -> 글 전체를 훑지 않음, 최신 글부터
+# - sqlite: FTS5 인덱스 조회, bm25 순위 + 발췌(snippet) 강조
+# - per_page개까지 (기본 BOARD_PER_PAGE)
+@app.route('/search')
+def search():
+    q = request.args.get('q', '').strip()
+    per_page = min(max(request.args.get('per_page', BOARD_PER_PAGE, type=int), 1), BOARD_MAX_PER_PAGE)
+    total, posts = get_store().search(q, per_page) if q else (0, [])
+    return render_template('search.html', q=q, posts=posts, total=total)
+
+
+TEMPLATES['create.html'] = ''' 
+        <h2>✏️ 글 작성</h2>
+        <form method="post" enctype="multipart/form-data">
+            제목: <input type="text" name="title" required><br><br>
+            내용: <br>
+            <textarea name="content" rows="8" cols="70" required></textarea><br>
+            이미지(선택): <input type="file" name="image" accept=".png,.jpg,.jpeg,.gif,.webp"><br><br>
+            <button type="submit">저장</button>
+        </form>
+        <a href="{{ url_for('board') }}">목록으로</a>   
+    '''
+
 # 💜 📝 글 작성 페이지 / create
 @app.route('/create', methods=['GET', 'POST'])
 def create():
@@ -183,44 +2785,47 @@ def create():
         # strip은 선택사항: 제목 잎뒤 공백 제거, 본문은 줄바꿈 유지가 목적이라 그대로 저장
         title = request.form.get('title', '').strip()
         content = request.form.get('content', '') # 폼에서 글 내용 가져오기
-        save_post(title, content) # 파일에 저장
+        image = ''
+        file = request.files.get('image') # 업로드는 UploadRequest가 이미 UPLOAD_DIR 임시 파일로 받아 둠
+        with _write_lock: # 이미지 파일 연결 ~ 글 저장 사이에 다른 요청의 정리(collect_image)가 끼지 않게
+            if file and file.filename:
+                image = save_image(file)
+                if image is None:
+                    return IMAGE_REJECTED, 400
+            post_id = get_store().save_post(title, content, image) # 저장소에 저장
+        schedule_thumbnails(post_id, image)
+        _invalidate_pages()
         return redirect(url_for('board')) # 목록으로 이동
     
     # GET 요청: 글쓰기 폼 보여줌, 템플릿 안 따옴표 이슈를 피하려면 url_for 결과를 변수로 내려도 됨(선택)
-    return render_template_string(''' 
-        <h2>✏️ 글 작성</h2>
-        <form method="post">
-            제목: <input type="text" name="title" required><br><br>
-            내용: <br>
-            <textarea name="content" rows="8" cols="70" required></textarea><br>
-            <button type="submit">저장</button>
-        </form>
-        <a href="{{ url_for('board') }}">목록으로</a>   
-    ''')
+    return render_template('create.html')
 # ✅ request.method: GET인지 POST인지 확인
 # ✅ request.form['content']: 사용자가 입력한 내용
+# ✅ request.files['image']: 업로드한 파일 (enctype="multipart/form-data" 폼이어야 전달됨)
 
-# 💜 글 상세보기(여기서 ✏️수정, ❌삭제로 변경)
-# <div></div> 내부에 edit, delete 는 함수 이름
-@app.route('/detail/<int:index>')
-def detail(index):
-    posts = load_posts()
-    if 0 <= index < len(posts):
-        post = posts[index]
-        comments = post.get('comments', []) # 파이썬에서 미리 준비(없으면 빈 리스트)
-        return render_template_string('''
+TEMPLATES['detail.html'] = '''
             <!doctype html>
             <title>상세</title>                          
 
             <h2>📝 {{ post.title }}</h2>
             <!-- 🔹pre + white-space:pre-wrap 으로 줄바꿈/공백을 그대로 표시 -->
+            {% if post.image %}
+                <!-- 🔹썸네일이 있으면 브라우저가 화면 폭에 맞는 가장 작은 파일을 고름 -->
+                <picture>
+                    {% if srcsets.webp %}
+                        <source type="image/webp" srcset="{{ srcsets.webp }}" sizes="(max-width: 800px) 100vw, 800px">
+                    {% endif %}
+                    <img src="{{ upload_url(post.image) }}" alt="" style="max-width:100%; height:auto;"
+                        {% if srcsets.img %}srcset="{{ srcsets.img }}" sizes="(max-width: 800px) 100vw, 800px"{% endif %}>
+                </picture>
+            {% endif %}
             <pre style="white-space: pre-wrap; font-family:inherit;">{{ post.content }}</pre>
                           
             <div style="display:flex; gap:10px; margin-top: 10px;">
-                <a href="{{ url_for('edit', index=index) }}">
+                <a href="{{ url_for('edit', post_id=post.id) }}">
                     <button type="button">✏️수정</button></a>
                 <!-- 🔹삭제는 POST로 안전하게 -->
-                <form method="post" action="{{ url_for('delete', index=index) }}" 
+                <form method="post" action="{{ url_for('delete', post_id=post.id) }}" 
                     onsubmit="return confirm('정말 삭제할까요?');">
                     <button type="submit" style="background:#ff4d4f; color:white;">❌삭제</button>
                 </form>
@@ -237,7 +2842,7 @@ def detail(index):
                         {% endif %}
                         <!-- 댓글 삭제 버튼(옵션) -->
                         <form method="post"
-                            action="{{ url_for('delete_comment_route', index=index, cidx=loop.index0) }}"
+                            action="{{ url_for('delete_comment_route', post_id=post.id, cidx=loop.index0) }}"
                              style="display:inline"
                              onsubmit="return confirm('댓글을 삭제할까요?');">    
                             <button type="submit" style="border:none;background:none;color:#c00;cursor:pointer;">
@@ -250,67 +2855,272 @@ def detail(index):
                 {% endfor %}              
             </ul>
             
-            <form method="post" action="{{ url_for('add_comment_route', index=index) }}">
+            <form method="post" action="{{ url_for('add_comment_route', post_id=post.id) }}">
                 <textarea name="comment" rows="3" cols="70" required placeholder="댓글을 입력하세요"></textarea><br>
                 <button type="submit">댓글 등록</button>                                               
             </form>
             
             <p><a href = "{{ url_for('board') }}">목록으로</a></p>
-        ''', post=post, index=index, comments=comments)
+        '''
+
+# 💜 글 상세보기(여기서 ✏️수정, ❌삭제로 변경)
+# <div></div> 내부에 edit, delete 는 함수 이름
+# 💜 글 주소는 순서(index)가 아니라 글 id: 앞의 글이 지워져도 주소가 바뀌지 않음
+@app.route('/post/<int:post_id>')
+def detail(post_id):
+    store = get_store()
+    version, last_modified = store.cache_version(post_id) # 이 글만의 버전 (다른 글이 바뀌어도 그대로)
+    if version is not None:
+        not_modified = _not_modified(version, last_modified)
+        if not_modified is not None:
+            return not_modified
+        html = _cached_page(('post', post_id), _etag_for(version))
+        if html is not None:
+            return _with_validators(html, version, last_modified)
+    post = store.load_post(post_id) # 해당 글 한 건만 읽음
+    if post is not None:
+        comments = post.comments # 파이썬에서 미리 준비
+        html = render_template('detail.html', post=post, comments=comments, srcsets=image_srcsets(post))
+        if version is None:
+            return html
+        _store_page(('post', post_id), _etag_for(version), html)
+        return _with_validators(html, version, last_modified)
     return "글이 존재하지 않습니다.", 404
 
+# 예전 순서 기반 주소(/detail/<index>)는 해당 글의 id 주소로 보내줌 (북마크 호환)
+@app.route('/detail/<int:index>')
+def detail_by_index(index):
+    posts = get_store().list_summaries(index, 1)
+    if not posts:
+        return "글이 존재하지 않습니다.", 404
+    return redirect(url_for('detail', post_id=posts[0]['id']))
 
-# 💜 글 수정하기 / 새로운 라우트 추가: /edit/<int:index>
-@app.route('/edit/<int:index>', methods=['GET', 'POST'])
-def edit(index):
-    # 수정: 기존 값으로 폼 채워주고, 저장 시 덮어쓰기
-    posts = load_posts()
-    if not (0 <= index < len(posts)):
-        return "글이 존재하지 않습니다", 404
-    
-    if request.method == 'POST':
-        posts[index]['title'] = request.form.get('title', '').strip()
-        posts[index]['content'] = request.form.get('content', '')
-        save_all_posts(posts)
-        return redirect(url_for('detail', index=index))
-          
-    
-    # GET 요청: 기존 글 데이터 폼에 미리 채워서 보여줌
-    post = posts[index]
-    return render_template_string('''
+
+TEMPLATES['edit.html'] = '''
         <h2>✏️ 글 수정</h2>
-        <form method = "post">
+        <form method = "post" enctype="multipart/form-data">
             제목: <input type="text" name="title" value="{{ post.title }}" required><br><br>
             내용: <br>
             <textarea name="content" rows="8" cols="70" required>{{ post.content }}</textarea><br>
+            {% if post.image %}
+                <img src="{{ upload_url(post.image) }}" alt="" style="max-width:200px; height:auto;"><br>
+                <label><input type="checkbox" name="remove_image" value="1"> 이미지 삭제</label><br>
+            {% endif %}
+            이미지 {% if post.image %}바꾸기{% else %}추가{% endif %}(선택): <input type="file" name="image" accept=".png,.jpg,.jpeg,.gif,.webp"><br><br>
             <button type="submit">수정 완료</button>
         </form>
-        <p><a href="{{ url_for('detail', index=index) }}">뒤로</a></p>  
-    ''', post=post, index=index)
+        <p><a href="{{ url_for('detail', post_id=post.id) }}">뒤로</a></p>  
+    '''
+
+# 💜 글 수정하기 / 새로운 라우트 추가: /post/<int:post_id>/edit
+@app.route('/post/<int:post_id>/edit', methods=['GET', 'POST'])
+def edit(post_id):
+    # 수정: 기존 값으로 폼 채워주고, 저장 시 덮어쓰기
+    if request.method == 'POST':
+        title = request.form.get('title', '').strip()
+        content = request.form.get('content', '')
+        image = '' if request.form.get('remove_image') else None # None: 기존 이미지 그대로
+        file = request.files.get('image')
+        with _write_lock:
+            if file and file.filename:
+                image = save_image(file)
+                if image is None:
+                    return IMAGE_REJECTED, 400
+            if not get_store().edit_post(post_id, title, content, image):
+                collect_image(get_store(), image) # 없는 글에 올린 이미지
+                return "글이 존재하지 않습니다", 404
+        schedule_thumbnails(post_id, image)
+        _invalidate_pages(post_id)
+        return redirect(url_for('detail', post_id=post_id))
+          
+    
+    # GET 요청: 기존 글 데이터 폼에 미리 채워서 보여줌 (해당 글 한 줄만 읽음)
+    post = get_store().load_post(post_id)
+    if post is None:
+        return "글이 존재하지 않습니다", 404
+    return render_template('edit.html', post=post)
 
 # 💜❌ 글 삭제기능
-@app.route('/delete/<int:index>', methods=['POST'])
-def delete(index):
+@app.route('/post/<int:post_id>/delete', methods=['POST'])
+def delete(post_id):
     # 삭제: 상세에서만 POST로 호출
-    posts = load_posts()
-    if 0 <= index < len(posts):
-        del posts[index]
-        save_all_posts(posts)
+    get_store().delete_post(post_id)
+    _invalidate_pages(post_id)
     return redirect(url_for('board'))
 
 
 # 💜 댓글; 추가 삭제 라우트
-@app.route('/comment/<int:index>', methods=['post'])
-def add_comment_route(index):
+@app.route('/post/<int:post_id>/comment', methods=['post'])
+def add_comment_route(post_id):
     text = request.form.get('comment', '').strip()
     if text:
-        add_comment(index, text)
-    return redirect( url_for('detail', index=index))
+        get_store().add_comment(post_id, text)
+        _invalidate_pages(post_id)
+    return redirect( url_for('detail', post_id=post_id))
+
+@app.route('/post/<int:post_id>/comment/<int:cidx>/delete', methods=['POST'])
+def delete_comment_route(post_id, cidx):
+    get_store().delete_comment(post_id, cidx)
+    _invalidate_pages(post_id)
+    return redirect(url_for('detail', post_id=post_id))
+
+# 💜 업로드 파일 /uploads/<파일 이름>
+# - 파일 이름이 내용 해시(썸네일은 원본 해시 + 폭)라서 같은 주소의 내용은 절대 바뀌지 않음
+#   -> Cache-Control: public, max-age=1년, immutable: 브라우저/CDN이 다시 묻지도 않음
+# - 그래도 물어보면(새로고침 등) If-None-Match/If-Modified-Since에 304, Range 요청(이어받기)에 206 (send_from_directory)
+# - 앞에 웹서버가 있으면 파일 전송을 넘겨서 파이썬 워커가 바이트를 나르지 않게
+#   USE_X_SENDFILE=True         : X-Sendfile 헤더 (Apache mod_xsendfile, lighttpd)
+#   UPLOAD_ACCEL_REDIRECT='/_uploads/' : X-Accel-Redirect 헤더 (nginx의 internal location이 UPLOAD_DIR을 가리키게 설정)
+#     location /_uploads/ { internal; alias /경로/static/uploads/; }
+# - 예전 주소(/static/uploads/...)도 그대로 열림
+app.config.setdefault('UPLOAD_MAX_AGE', 365 * 24 * 3600)
+app.config.setdefault('UPLOAD_ACCEL_REDIRECT', os.environ.get('UPLOAD_ACCEL_REDIRECT'))
+
+@app.template_global()
+def upload_url(image):
+    # 글의 image('uploads/파일 이름') -> /uploads/파일 이름
+    return url_for('upload', name=Path(image).name)
+
+@app.route('/uploads/<name>')
+def upload(name):
+    if name.startswith('.') or not os.path.isfile(UPLOAD_DIR / name): # 받는 중인 임시 파일은 숨김
+        return "파일이 존재하지 않습니다.", 404
+    accel = app.config['UPLOAD_ACCEL_REDIRECT']
+    if accel:
+        response = make_response('')
+        response.headers['X-Accel-Redirect'] = f"{accel.rstrip('/')}/{name}"
+        response.mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    else:
+        # ETag = 파일 이름 (내용이 곧 이름이라 mtime 기반 기본값과 달리 서버/복원과 무관하게 같음)
+        response = send_from_directory(UPLOAD_DIR, name, max_age=app.config['UPLOAD_MAX_AGE'], etag=name)
+    response.cache_control.public = True
+    response.cache_control.max_age = app.config['UPLOAD_MAX_AGE']
+    response.cache_control.immutable = True
+    return response
+
+# 💜 모니터링용: 저장소별 상태 (jsonl: 읽기 캐시 적중/미스, compaction / sqlite: 글/댓글 수) + 페이지 캐시 + 썸네일 작업
+@app.route('/metrics')
+def metrics():
+    return jsonify({'store': app.config['POST_STORE'], **get_store().stats(), 'page_cache': page_cache_stats(),
+                    'thumbnails': thumbnail_stats()})
+
+# 💜 템플릿 렌더링 벤치마크: 요청마다 컴파일(render_template_string) vs 캐시된 템플릿(render_template)
+@app.cli.command('bench-render')
+@click.option('-n', '--number', default=2000, help='템플릿마다 반복 횟수')
+def bench_render_command(number):
+    """페이지별 1회 렌더링 시간을 비교해서 출력한다."""
+    post = Post(1, '제목', '본문\n' * 20,
+                comments=[Comment(f'댓글 {i}', '2024-01-01T00:00:00') for i in range(10)])
+    contexts = {
+        'board.html': {'posts': [{'id': 1, 'title': '제목', 'comment_count': 10,
+                                  'last_activity': '2024-01-01T00:00:00'}] * 20, 'page': 1, 'pages': 5, 'total': 100, 'per_page': 20,
+                       'has_next': True},
+        'create.html': {},
+        'detail.html': {'post': post, 'comments': post.comments, 'srcsets': {}},
+        'edit.html': {'post': post},
+    }
+    with app.test_request_context():
+        for name, ctx in contexts.items():
+            render_template(name, **ctx) # 첫 컴파일은 측정에서 제외
+            t0 = time.perf_counter()
+            for _ in range(number):
+                render_template_string(TEMPLATES[name], **ctx)
+            t1 = time.perf_counter()
+            for _ in range(number):
+                render_template(name, **ctx)
+            t2 = time.perf_counter()
+            before = (t1 - t0) / number * 1e6
+            after = (t2 - t1) / number * 1e6
+            print(f"{name:12} render_template_string {before:8.1f} us  ->  render_template {after:8.1f} us  "
+                  f"(x{before / after:.1f})")
+
+# 💜 목록용 읽기 벤치마크: 글 전체 파싱 vs 필드 선택 파싱 (요약 재생성과 같은 읽기)
+@app.cli.command('bench-listing')
+@click.option('-n', '--number', default=5, help='반복 횟수')
+def bench_listing_command(number):
+    """posts.txt 전체를 요약 필드로 읽을 때 디코딩한 바이트와 시간을 비교해서 출력한다."""
+    def run(read):
+        before = decode_stats()
+        t0 = time.perf_counter()
+        for _ in range(number):
+            count = sum(1 for _ in read())
+        elapsed = (time.perf_counter() - t0) / number
+        after = decode_stats()
+        return count, elapsed, (after['bytes_decoded'] - before['bytes_decoded']) // number
+
+    full = run(lambda: (_project(p, _SUMMARY_FIELDS) for p in iter_posts()))
+    light = run(lambda: iter_posts(fields=_SUMMARY_FIELDS))
+    for name, (count, elapsed, decoded) in (('full parse', full), ('projected', light)):
+        print(f"{name:11} {count} posts  {elapsed * 1e3:8.1f} ms  decoded {decoded} bytes "
+              f"({decoded / max(count, 1):.0f} bytes/post)")
+
+# 💜 검색 벤치마크: SQLite FTS5 인덱스 조회 vs LIKE 스캔 vs load_posts() 전체를 훑는 단순 검색
+# - 3글자 이상 검색어는 posts_fts(trigram), 2글자 검색어는 posts_bigram 경로를 탐 -> 둘 다 따로 잼
+@app.cli.command('bench-search')
+@click.option('--posts', default=20000, help='글 수')
+@click.option('-n', '--number', default=10, help='검색어 수 (길이별)')
+def bench_search_command(posts, number):
+    """임시 SQLite DB에 한글 글/댓글을 만들어 검색 방식별 1회 시간을 검색어 길이별로 비교해서 출력한다."""
+    import random
+    rng = random.Random(0)
+    syllables = [chr(0xAC00 + i) for i in range(0, 11172, 7)]
+    words = [''.join(rng.choices(syllables, k=rng.randint(2, 4))) for _ in range(5000)]
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SqlitePostStore(os.path.join(tmp, 'bench.db'))
+        with store._conn() as conn:
+            conn.executemany('INSERT INTO posts (title, content, created_at) VALUES (?, ?, ?)',
+                             [(' '.join(rng.choices(words, k=3)), ' '.join(rng.choices(words, k=60)), '')
+                              for _ in range(posts)])
+            conn.executemany('INSERT INTO comments (post_id, text, created_at) VALUES (?, ?, ?)',
+                             [(rng.randint(1, posts), ' '.join(rng.choices(words, k=5)), '')
+                              for _ in range(posts)])
+        queries = {'3+ chars': rng.sample([w for w in words if len(w) >= 3], number),
+                   '2 chars': rng.sample([w for w in words if len(w) == 2], number)}
+
+        def naive(q):
+            found = [p for p in store.load_posts()
+                     if q in p.title or q in p.content or any(q in c.text for c in p.comments)]
+            return len(found)
+
+        fts = 'fts5 (' + store.fts_tokenizer + (' + bigram' if store.fts_bigram else '') + ')' \
+            if store.fts_tokenizer else 'fts5 (none -> like)'
+        runs = (('load_posts scan', naive), ('like scan', lambda q: store._search_like(q, BOARD_PER_PAGE)[0]),
+                (fts, lambda q: store.search(q, BOARD_PER_PAGE)[0]))
+        for kind, qs in queries.items():
+            for name, run in runs:
+                t0 = time.perf_counter()
+                counts = [run(q) for q in qs]
+                elapsed = (time.perf_counter() - t0) / number
+                print(f"{kind:8} {name:26} {elapsed * 1e3:9.2f} ms/query  (matches {sum(counts)})")
+
+# 💜 메모리 벤치마크: 글/댓글을 dict로 들고 있을 때 vs Post/Comment(__slots__)
+@app.cli.command('bench-memory')
+@click.option('--posts', default=10000, help='글 수')
+@click.option('--comments', default=10, help='글마다 댓글 수 (기본: 총 10만 개)')
+def bench_memory_command(posts, comments):
+    """같은 게시판을 두 방식으로 만들어서 tracemalloc으로 잰 메모리를 출력한다."""
+    import tracemalloc
+    # 문자열은 두 방식이 똑같이 쓰므로 미리 만들어 두고 컨테이너(글/댓글 객체)만 비교
+    created = '2024-01-01T00:00:00'
+    rows = [(i, f'제목 {i}', f'본문 {i}', [f'댓글 {i}-{j}' for j in range(comments)]) for i in range(posts)]
+
+    def as_dicts():
+        return [{'id': i, 'title': t, 'content': c, 'image': '', 'created_at': created,
+                 'comments': [{'text': x, 'created_at': created} for x in cs]} for i, t, c, cs in rows]
+
+    def as_slots():
+        return [Post(i, t, c, '', created, [Comment(x, created) for x in cs]) for i, t, c, cs in rows]
 
-@app.route('/comment/<int:index>/delete/<int:cidx>', methods=['POST'])
-def delete_comment_route(index, cidx):
-    delete_comment(index, cidx)
-    return redirect(url_for('detail', index=index))
+    results = {}
+    for name, build in (('dict', as_dicts), ('slots', as_slots)):
+        tracemalloc.start()
+        board = build()
+        results[name] = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del board
+    for name, size in results.items():
+        print(f"{name:6} {posts} posts / {posts * comments} comments  {size / 2**20:8.1f} MiB")
+    print(f"slots / dict = {results['slots'] / results['dict']:.2f}")
 
 # 🖥️ 서버실행
 if __name__ ==  '__main__':
@@ -0,0 +1,582 @@
+# 💜 app.py 동작 테스트: python -m pytest -q (저장소 루트에서)
+# - 이미지 검사(check_image): 형식별로 직접 만든 헤더, 잘린 입력, 이미지가 아닌 업로드
+# - JSONL 저장소: 저널 -> compaction -> 새 프로세스에서 다시 읽기 (삭제된 글 포함)
+#   compaction 도중 죽어서 남은 저널은 inode가 재사용돼도 다시 적용하지 않음
+#   같은 글을 두 번 지워도 한 번만 기록/적용
+#   flask compact: 죽은 줄이 없으면 다시 쓰지 않음
+# - JSONL 이미지 참조 수: 쓰기마다 참조 수 파일만 갱신 (글 전체를 다시 세지 않음), compaction 후에도 같은 값
+#   compaction 뒤 inode가 재사용돼도 옛 메모리 값을 믿고 쓰는 파일을 지우지 않음
+# - 검색: bigram만 겹치는 글("게시 시판")은 "게시판" 검색에 나오지 않음 (JSONL/SQLite 같은 결과)
+#   compaction 뒤에는 다시 색인하지 않고 못 본 저널 이벤트만 따라잡음
+# - 디스크 페이지 캐시: 저장 도중 다른 워커의 invalidate가 끼어들어도 예외 없음
+# - 목록 요약: 댓글 삭제 후 마지막 활동이 요약 파일/compaction/재생성/SQLite에서 모두 같음
+#   compaction 뒤 inode가 재사용돼도 옛 위치에서 이어 읽지 않음
+# - id -> 위치 맵: compaction 뒤 재사용된 inode로 옛 맵을 쓰지 않음, 인덱스 줄 id가 다르면 None
+# - 필드 선택 파싱: 앞부분 파싱이 실패한 줄은 디코딩 바이트를 두 번 세지 않음
+# - HTTP 캐시 검증: 목록/글 304, 그 글이 바뀌면 200, 다른 글만 바뀌면 글 페이지는 304
+#   If-None-Match 우선, 1초 안에 바뀐 파일은 Last-Modified 없음, ETag 버전은 읽기 전에 구함
+# - /board 페이지 나누기: ?page=, 지운 글을 넘는 ?after= 커서, 전체 개수
+# - flask migrate: 구형 줄이 섞인 파일에 형식 헤더, 글 id/내용 유지, 두 번째 실행은 already migrated
+# - Pillow 없이 돌도록 이미지는 헤더 바이트만 직접 만듦
+import io
+import json
+import os
+import re
+import struct
+import subprocess
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from werkzeug.datastructures import FileStorage
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+import app as board # noqa: E402
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    # 글 파일/업로드 폴더를 테스트마다 새 임시 디렉터리로 (백그라운드 compactor는 끔)
+    uploads = tmp_path / 'uploads'
+    uploads.mkdir()
+    monkeypatch.setattr(board, 'FILE_PATH', str(tmp_path / 'posts.txt'))
+    monkeypatch.setattr(board, 'UPLOAD_DIR', uploads)
+    monkeypatch.setitem(board.app.config, 'POST_STORE', 'jsonl')
+    monkeypatch.setitem(board.app.config, 'COMPACT_IN_BACKGROUND', False)
+    board._invalidate_posts_cache()
+    return tmp_path
+
+
+# 💜 형식별 헤더 만들기 (check_image가 읽는 부분만)
+def png(w, h):
+    return b'\x89PNG\r\n\x1a\n' + struct.pack('>I', 13) + b'IHDR' + struct.pack('>IIBBBBB', w, h, 8, 2, 0, 0, 0)
+
+
+def gif(w, h):
+    return b'GIF89a' + struct.pack('<HH', w, h) + b'\xf7\x00\x00'
+
+
+def webp_vp8(w, h):
+    frame = b'\x00\x00\x00' + b'\x9d\x01\x2a' + struct.pack('<HH', w, h)
+    return b'RIFF' + struct.pack('<I', 4 + 8 + len(frame)) + b'WEBP' + b'VP8 ' + struct.pack('<I', len(frame)) + frame
+
+
+def webp_vp8l(w, h):
+    bits = (w - 1) | (h - 1) << 14
+    frame = b'\x2f' + bits.to_bytes(4, 'little') + b'\x00' * 5
+    return b'RIFF' + struct.pack('<I', 4 + 8 + len(frame)) + b'WEBP' + b'VP8L' + struct.pack('<I', len(frame)) + frame
+
+
+def webp_vp8x(w, h):
+    frame = b'\x10\x00\x00\x00' + (w - 1).to_bytes(3, 'little') + (h - 1).to_bytes(3, 'little')
+    return b'RIFF' + struct.pack('<I', 4 + 8 + len(frame)) + b'WEBP' + b'VP8X' + struct.pack('<I', len(frame)) + frame
+
+
+def jpeg(w, h, app1=0):
+    # SOI + (app1바이트짜리 APP1/EXIF 세그먼트들) + DQT + SOF0
+    out = b'\xff\xd8'
+    while app1 > 0:
+        size = min(app1, 0xffff - 2)
+        out += b'\xff\xe1' + struct.pack('>H', size + 2) + b'E' * size
+        app1 -= size
+    out += b'\xff\xdb' + struct.pack('>H', 67) + b'\x00' * 65
+    out += b'\xff\xc0' + struct.pack('>HBHHB', 17, 8, h, w, 3) + b'\x01\x22\x00\x02\x11\x01\x03\x11\x01'
+    return out
+
+
+HEADERS = {
+    'png': (png(640, 480), ('png', 640, 480)),
+    'gif': (gif(32, 16), ('gif', 32, 16)),
+    'webp-vp8': (webp_vp8(300, 200), ('webp', 300, 200)),
+    'webp-vp8l': (webp_vp8l(301, 201), ('webp', 301, 201)),
+    'webp-vp8x': (webp_vp8x(4000, 3000), ('webp', 4000, 3000)),
+    'jpeg': (jpeg(1024, 768), ('jpg', 1024, 768)),
+    'jpeg-big-app1': (jpeg(1024, 768, app1=200_000), ('jpg', 1024, 768)),
+}
+
+
+@pytest.mark.parametrize('name', HEADERS)
+def test_check_image_reads_size_from_header(name):
+    head, expected = HEADERS[name]
+    assert board.check_image(head) == expected
+
+
+@pytest.mark.parametrize('name', HEADERS)
+def test_check_image_waits_for_more_bytes_when_truncated(name):
+    # 모자란 앞부분은 거절하지 않고 None (업로드 중 다음 조각을 기다림), 다 모이면 같은 결과
+    head, expected = HEADERS[name]
+    first = next(n for n in range(1, len(head) + 1) if board.check_image(head[:n]) is not None)
+    assert all(board.check_image(head[:n]) is None for n in range(1, first))
+    assert board.check_image(head[:first]) == expected
+
+
+def test_check_image_rejects_jpeg_without_size_within_sniff_limit(monkeypatch):
+    # EXIF 등이 IMAGE_SNIFF_BYTES를 넘도록 SOF가 안 나오면 끝까지 기다리지 않고 거절
+    monkeypatch.setitem(board.app.config, 'IMAGE_SNIFF_BYTES', 64 * 1024)
+    head = jpeg(10, 10, app1=100_000)
+    assert board.check_image(head[:32 * 1024]) is None
+    with pytest.raises(board.ImageRejected):
+        board.check_image(head[:64 * 1024])
+
+
+@pytest.mark.parametrize('head', [
+    b'<html>hello</html>',
+    b'PK\x03\x04' + b'\x00' * 40,
+    b'RIFF\x24\x00\x00\x00WAVEfmt ' + b'\x00' * 20,
+    b'\xff\xd8\xff\xda' + b'\x00' * 40, # 크기(SOF) 없이 바로 영상 데이터
+    png(0, 10),
+])
+def test_check_image_rejects_non_images(head):
+    with pytest.raises(board.ImageRejected):
+        board.check_image(head)
+
+
+def test_check_image_rejects_oversized_images():
+    with pytest.raises(board.ImageRejected, match='너무 큽니다'):
+        board.check_image(png(20_000, 10))
+    with pytest.raises(board.ImageRejected, match='너무 큽니다'):
+        board.check_image(png(8_000, 8_000)) # 한 변은 허용, 화소 수 초과
+
+
+def test_upload_of_non_image_named_png_is_rejected(data_dir):
+    client = board.app.test_client()
+    response = client.post('/create', content_type='multipart/form-data', data={
+        'title': '제목', 'content': '본문', 'image': (io.BytesIO(b'not an image at all' * 1000), 'photo.png')})
+    assert response.status_code == 400
+    assert response.get_data(as_text=True) == board.IMAGE_REJECTED
+    assert list(board.UPLOAD_DIR.iterdir()) == [] # 받던 임시 파일도 남지 않음
+    assert board.get_store().count_posts() == 0
+
+
+def test_saved_image_is_named_by_content_and_real_format(data_dir):
+    # 이름만 .png인 JPEG는 .jpg로, 같은 내용은 같은 파일 하나
+    head = jpeg(64, 48)
+    with board._write_lock:
+        first = board.save_image(FileStorage(io.BytesIO(head), 'photo.png'))
+        second = board.save_image(FileStorage(io.BytesIO(head), 'again.jpg'))
+    assert first == second
+    assert first.startswith('uploads/') and first.endswith('.jpg')
+    assert [p.name for p in board.UPLOAD_DIR.iterdir()] == [Path(first).name]
+
+
+# 💜 JSONL 저장소: 저널 -> compaction -> 다시 읽기
+def _snapshot(store):
+    posts = [{'id': p.id, 'title': p.title, 'content': p.content,
+              'comments': [c.text for c in p.comments]} for p in store.iter_posts()]
+    return {'posts': posts, 'summaries': store.list_summaries(0, 100), 'count': store.count_posts()}
+
+
+def _reload_snapshot(file_path):
+    # 새 프로세스에서 같은 파일을 읽은 결과 (프로세스 안의 캐시 없이)
+    code = ('import json, sys; sys.path.insert(0, sys.argv[1]); import app; app.FILE_PATH = sys.argv[2]; '
+            's = app.get_store(); print(json.dumps({"posts": [{"id": p.id, "title": p.title, "content": p.content, '
+            '"comments": [c.text for c in p.comments]} for p in s.iter_posts()], '
+            '"summaries": s.list_summaries(0, 100), "count": s.count_posts(), "next": app._next_post_id()}))')
+    out = subprocess.run([sys.executable, '-c', code, str(ROOT), file_path], check=True, capture_output=True,
+                         cwd=os.path.dirname(file_path), env={**os.environ, 'POST_STORE': 'jsonl'}).stdout
+    return json.loads(out)
+
+
+def test_journal_compact_reload_round_trip(data_dir):
+    store = board.get_store()
+    ids = [store.save_post(f'제목 {i}', f'본문 {i}\n둘째 줄') for i in range(6)]
+    assert store.add_comment(ids[1], '첫 댓글')
+    assert store.add_comment(ids[1], '둘째 댓글')
+    assert store.delete_comment(ids[1], 0)
+    assert store.edit_post(ids[2], '고친 제목', '고친 본문')
+    assert store.delete_post(ids[3])
+    assert store.delete_post(ids[5]) # 마지막 글: 지워도 id를 다시 쓰지 않아야 함
+    assert not store.add_comment(ids[3], '지운 글에 댓글')
+
+    before = _snapshot(store)
+    assert [p['id'] for p in before['posts']] == [ids[0], ids[1], ids[2], ids[4]]
+    assert before['posts'][1]['comments'] == ['둘째 댓글']
+    assert before['posts'][2]['title'] == '고친 제목'
+    assert os.path.exists(board._journal_path())
+    assert _reload_snapshot(board.FILE_PATH)['posts'] == before['posts'] # 저널만 있는 상태도 다른 프로세스에서 같게
+
+    assert board.compact_posts()
+    assert not os.path.exists(board._journal_path())
+    assert _snapshot(store) == before
+    assert store.load_post(ids[3]) is None and store.load_post(ids[5]) is None
+
+    reloaded = _reload_snapshot(board.FILE_PATH)
+    assert reloaded['posts'] == before['posts']
+    assert reloaded['summaries'] == before['summaries']
+    assert reloaded['count'] == 4
+    assert reloaded['next'] == ids[5] + 1
+    assert store.save_post('새 글', '') == ids[5] + 1
+
+
+def test_journal_left_by_a_crashed_compaction_is_not_replayed_on_a_recycled_inode(data_dir):
+    store = board.get_store()
+    ids = [store.save_post(f'글 {i}', '') for i in range(3)]
+    store.add_comment(ids[0], '댓글')
+    store.delete_post(ids[1])
+    journal = Path(board._journal_path()).read_bytes()
+    assert board.compact_posts()
+    # os.replace 직후 죽어서 저널이 남았고, 새 posts.txt가 옛 inode를 다시 받은 상황 (gen은 새 값)
+    header, rest = journal.split(b'\n', 1)
+    header = json.loads(header)
+    header['base_ino'] = os.stat(board.FILE_PATH).st_ino
+    Path(board._journal_path()).write_bytes(json.dumps(header).encode() + b'\n' + rest)
+    board._invalidate_posts_cache()
+    assert [c.text for c in store.load_post(ids[0]).comments] == ['댓글']
+    assert [p.id for p in store.iter_posts()] == [ids[0], ids[2]]
+    assert store.add_comment(ids[2], '새 댓글') # 남은 저널은 버리고 새 헤더로 시작
+    assert [c.text for c in store.load_post(ids[0]).comments] == ['댓글']
+    assert [p.id for p in store.iter_posts()] == [ids[0], ids[2]]
+
+
+def test_deleting_the_same_post_twice_records_and_skips_it_once(data_dir):
+    store = board.get_store()
+    ids = [store.save_post(f'글 {i}', '') for i in range(5)]
+    assert store.delete_post(ids[1])
+    assert not store.delete_post(ids[1]) # 확인은 쓰기 락 안에서 -> 두 번째 삭제는 기록되지 않음
+    assert not store.add_comment(ids[1], '지운 글에 댓글')
+    store.add_comment(ids[0], '댓글')
+    store.delete_comment(ids[0], 0)
+    store.delete_comment(ids[0], 0) # 이미 없는 댓글
+    events = [json.loads(line) for line in Path(board._journal_path()).read_text().splitlines()[1:]]
+    assert [e['op'] for e in events] == ['post_deleted', 'comment_added', 'comment_deleted']
+
+    # 예전에 두 번 기록된 삭제가 남아 있어도 위치는 한 번만 건너뜀
+    board._append_line(board._journal_path(), json.dumps({'op': 'post_deleted', 'id': ids[1]}).encode())
+    board._invalidate_posts_cache()
+    assert [p.id for p in store.iter_posts(1, 2)] == [ids[2], ids[3]]
+    assert [p.id for p in store.list_posts(0, 10)] == [ids[0], ids[2], ids[3], ids[4]]
+
+
+# flask compact: 죽은 줄이 없으면 다시 쓰지 않음 (posts.txt의 gen이 그대로)
+def test_compact_command_skips_a_clean_file(data_dir):
+    store = board.get_store()
+    post_id = store.save_post('제목', '본문')
+    runner = board.app.test_cli_runner()
+    identity = board._posts_identity()
+    assert runner.invoke(board.compact_command).output == 'nothing to compact\n'
+    assert board._posts_identity() == identity
+    store.add_comment(post_id, '댓글')
+    assert runner.invoke(board.compact_command).output.startswith('compacted: ')
+    assert board._posts_identity() != identity
+    assert [c.text for c in store.load_post(post_id).comments] == ['댓글']
+
+
+def test_image_refs_follow_writes_without_rescanning_posts(data_dir, monkeypatch):
+    store = board.get_store()
+    a = store.save_post('a', '', 'uploads/a.png')
+    b = store.save_post('b', '', 'uploads/a.png')
+    c = store.save_post('c', '', 'uploads/c.png')
+    (board.UPLOAD_DIR / 'a.png').write_bytes(b'a')
+    (board.UPLOAD_DIR / 'c.png').write_bytes(b'c')
+    assert store.image_refs('uploads/a.png') == 2
+    with monkeypatch.context() as m:
+        # 참조 수 파일만 따라감: 쓰기/정리 중에 글 전체를 다시 읽지 않음
+        m.setattr(board, 'iter_posts', lambda *a, **k: pytest.fail('posts rescanned'))
+        assert store.edit_post(c, 'c', '', 'uploads/a.png')
+        assert store.image_refs('uploads/a.png') == 3 and store.image_refs('uploads/c.png') == 0
+        assert not (board.UPLOAD_DIR / 'c.png').exists()
+        assert store.delete_post(a) and store.edit_post(b, 'b', '', '')
+        assert store.image_refs('uploads/a.png') == 1
+        assert (board.UPLOAD_DIR / 'a.png').exists()
+    assert board.compact_posts()
+    assert store.image_refs('uploads/a.png') == 1
+    assert store.delete_post(c)
+    assert store.image_refs('uploads/a.png') == 0
+    assert not (board.UPLOAD_DIR / 'a.png').exists()
+
+
+def _recycle_inodes(state, sidecar_path):
+    # compaction 뒤 새 파일들이 예전 inode를 다시 받은 상황: 메모리 상태의 inode만 지금 파일과 같게 (gen은 옛 값 그대로)
+    state['ino'] = os.stat(sidecar_path).st_ino
+    state['base'] = (os.stat(board.FILE_PATH).st_ino, state['base'][1])
+
+
+def test_image_refs_reread_after_compactions_recycle_inodes(data_dir):
+    store = board.get_store()
+    first = store.save_post('a', '', 'uploads/x.png')
+    (board.UPLOAD_DIR / 'x.png').write_bytes(b'x')
+    assert store.image_refs('uploads/x.png') == 1
+    stale = {**board._image_refs, 'counts': board.Counter(board._image_refs['counts'])} # 잠들어 있던 워커의 메모리
+    store.save_post('b', '', 'uploads/x.png') # 다른 워커: 같은 이미지로 글 추가 + compaction
+    for _ in range(3):
+        store.add_comment(first, '댓글')
+        assert board.compact_posts()
+    board._image_refs.update(stale)
+    _recycle_inodes(board._image_refs, board._image_refs_path())
+    assert store.delete_post(first)
+    assert store.image_refs('uploads/x.png') == 1
+    assert (board.UPLOAD_DIR / 'x.png').exists()
+
+
+def test_summary_view_rereads_after_compactions_recycle_inodes(data_dir):
+    store = board.get_store()
+    ids = [store.save_post(f'글 {i}', '') for i in range(7)]
+    assert store.count_posts() == 7
+    stale = {**board._summary, 'by_id': dict(board._summary['by_id']), 'ids': list(board._summary['ids'])}
+    store.delete_post(ids[1]) # 다른 워커: 글 삭제/추가 + compaction
+    ids.append(store.save_post('새 글', ''))
+    for _ in range(3):
+        store.add_comment(ids[0], '댓글')
+        assert board.compact_posts()
+    board._summary.update(stale)
+    _recycle_inodes(board._summary, board._summary_path())
+    assert [s['id'] for s in store.list_summaries(0, 100)] == ids[:1] + ids[2:]
+    assert store.count_posts() == 7
+    assert store.list_summaries(0, 1)[0]['comment_count'] == 3
+
+
+# 💜 검색: bigram이 다 들어 있어도 단어가 없는 글은 결과에 없음 (두 저장소가 같은 결과)
+def _search_ids(store, query):
+    total, results = store.search(query, 10)
+    return total, sorted(r['id'] for r in results)
+
+
+def test_search_needs_the_whole_word_not_just_its_bigrams(data_dir):
+    stores = [board.get_store(), board.SqlitePostStore(str(data_dir / 'posts.db'))]
+    for store in stores:
+        split = store.save_post('게시 시판', '따로 떨어진 두 글자')
+        real = store.save_post('자유', '게시판에 글을 씁니다')
+        commented = store.save_post('댓글', '본문에는 없음')
+        store.add_comment(commented, '게시판 댓글')
+        assert _search_ids(store, '게시판') == (2, [real, commented])
+        assert _search_ids(store, '게시판 본문') == (1, [commented])
+        assert _search_ids(store, '시판') == (3, [split, real, commented])
+        assert split not in _search_ids(store, '시판게')[1]
+
+
+
+# 💜 검색: compaction 뒤에도 다시 색인하지 않고 prev 저널의 못 본 이벤트만 따라잡음 (본문은 메모리에 두지 않음)
+def test_search_follows_compaction_without_rebuilding(data_dir):
+    store = board.get_store()
+    kept = store.save_post('자유', '게시판 글')
+    gone = store.save_post('삭제', '게시판 글')
+    assert _search_ids(store, '게시판') == (2, [kept, gone])
+    rebuilds = board.search_stats()['rebuilds']
+    # 마지막 검색 뒤, compaction 전에 생긴 변경: 댓글/삭제(저널) + 새 글
+    store.add_comment(kept, '검색어 댓글')
+    store.delete_post(gone)
+    new = store.save_post('새 글', '게시판 새 글')
+    board.compact_posts()
+    assert _search_ids(store, '게시판') == (2, [kept, new])
+    assert _search_ids(store, '검색어') == (1, [kept])
+    assert board.search_stats()['rebuilds'] == rebuilds
+    assert 'texts' not in board._search
+    # 검색 없이 compaction이 두 번: 무엇을 놓쳤는지 모르므로 다시 색인
+    store.edit_post(new, '새 글', '본문 바꿈')
+    board.compact_posts()
+    board.compact_posts()
+    assert _search_ids(store, '게시판') == (1, [kept])
+    assert board.search_stats()['rebuilds'] == rebuilds + 1
+
+# 💜 디스크 페이지 캐시: 다른 워커의 invalidate가 저장 도중(임시 파일 -> 이름 바꾸기 사이)에 끼어들어도 요청은 실패하지 않음
+def test_disk_page_cache_set_survives_concurrent_invalidate(tmp_path, monkeypatch):
+    cache = board.DiskPageCache(str(tmp_path / 'pages'))
+    other = board.DiskPageCache(str(tmp_path / 'pages')) # 같은 디렉터리를 쓰는 다른 워커
+    key = ('board', 0, 20)
+    real_replace = os.replace
+
+    def invalidate_then_replace(src, dst):
+        other.invalidate()
+        return real_replace(src, dst)
+
+    monkeypatch.setattr(board.os, 'replace', invalidate_then_replace)
+    cache.set(key, '"v1"', '<p>목록</p>')
+    assert cache.get(key) == ('"v1"', '<p>목록</p>') # 쓰는 중인 임시 파일은 지우지 않음
+
+    def tmp_vanishes(src, dst):
+        os.remove(src) # 예: 다른 프로세스가 캐시 디렉터리를 비움
+        return real_replace(src, dst)
+
+    monkeypatch.setattr(board.os, 'replace', tmp_vanishes)
+    cache.set(key, '"v2"', '<p>새 목록</p>') # 예외 없이 저장만 건너뜀
+    monkeypatch.undo()
+    assert cache.get(key) == ('"v1"', '<p>목록</p>')
+    other.invalidate()
+    assert cache.get(key) is None
+    assert os.listdir(tmp_path / 'pages') == []
+
+
+# 💜 목록 요약의 마지막 활동: 댓글을 지우면 남은 작성/수정/댓글 시각으로 다시 계산 (요약 파일, compaction, SQLite 모두 같은 값)
+class _Clock:
+    # datetime 대신: now()를 부를 때마다 1초씩 (초 단위로 기록되는 시각이 겹치지 않게)
+    def __init__(self):
+        self.now_at = datetime(2026, 1, 1, 12, 0, 0)
+
+    def now(self):
+        self.now_at += timedelta(seconds=1)
+        return self.now_at
+
+
+def _last_activity(store, post_id):
+    return next(s['last_activity'] for s in store.list_summaries(0, 100) if s['id'] == post_id)
+
+
+def test_deleting_the_latest_comment_moves_last_activity_back_everywhere(data_dir, monkeypatch):
+    monkeypatch.setattr(board, 'datetime', _Clock())
+    jsonl, sqlite = board.get_store(), board.SqlitePostStore(str(data_dir / 'posts.db'))
+    for store in (jsonl, sqlite):
+        post_id = store.save_post('제목', '본문') # JSONL 12:00:01 / SQLite 12:00:05
+        store.add_comment(post_id, '첫 댓글') # :02 / :06
+        store.edit_post(post_id, '고친 제목', '본문') # :03 / :07
+        store.add_comment(post_id, '둘째 댓글') # :04 / :08
+        before = _last_activity(store, post_id)
+        store.delete_comment(post_id, 1) # 가장 늦은 댓글 -> 수정 시각이 마지막 활동
+        assert _last_activity(store, post_id) < before
+        store.delete_comment(post_id, 0)
+    assert _last_activity(jsonl, 1) == '2026-01-01T12:00:03'
+    assert _last_activity(sqlite, 1) == '2026-01-01T12:00:07'
+
+    assert board.compact_posts()
+    assert _last_activity(jsonl, 1) == '2026-01-01T12:00:03'
+    os.remove(board._summary_path()) # 요약 파일을 글에서 다시 만들어도 같은 값
+    assert _last_activity(jsonl, 1) == '2026-01-01T12:00:03'
+
+
+# 💜 id -> 위치 맵: compaction 뒤 인덱스 inode가 재사용돼도 옛 맵으로 다른 글을 돌려주지 않음
+def test_id_map_is_not_reused_across_compactions_with_a_recycled_inode(data_dir):
+    store = board.get_store()
+    ids = [store.save_post(f'글 {i}', '') for i in range(12)]
+    store.delete_post(ids[2])
+    store.load_post(ids[0])
+    stale = dict(board._id_map) # 지워진 글 3이 아직 위치 2에 있는 맵
+    assert board.compact_posts()
+    index_ino = os.stat(board._index_path()).st_ino
+
+    # 옛 posts.txt에서 만든 맵인데 인덱스 inode만 같아진 경우 -> 처음부터 다시 만듦
+    board._id_map.update(key=(index_ino, stale['key'][1]), ids=stale['ids'], pos=stale['pos'])
+    assert [store.load_post(i).id for i in (ids[3], ids[9])] == [ids[3], ids[9]]
+
+    # 맵이 어긋나 있어도 인덱스 줄의 id가 찾는 글과 다르면 다른 글 대신 None
+    view = board._journal_view()
+    assert board._read_post_at(stale['pos'][ids[3]], view, ids[3]) is None # 지금 그 자리는 ids[4]
+    assert board._read_post_at(stale['pos'][ids[3]] - 1, view, ids[3]).id == ids[3]
+    assert store.load_post(ids[2]) is None
+
+
+# 💜 필드 선택 파싱 통계: 앞부분 파싱이 실패해서 줄 전체를 파싱한 줄은 한 번만 셈
+def test_decoded_bytes_never_exceed_bytes_read_on_mixed_lines(data_dir, monkeypatch):
+    lines = [
+        '옛 제목|||옛 내용', # 구형 줄
+        json.dumps({'title': '키 순서가 옛날', 'content': '본문 ' * 50, 'comments': []}, ensure_ascii=False),
+        json.dumps({'id': 3, 'title': '새 줄', 'created_at': '', 'comment_count': 0, 'last_activity': '',
+                    'image': '', 'content': '본문 ' * 50, 'comments': []}, ensure_ascii=False),
+    ]
+    Path(board.FILE_PATH).write_text(''.join(line + '\n' for line in lines), encoding='utf-8')
+    monkeypatch.setattr(board, '_decode_stats', {'bytes_read': 0, 'bytes_decoded': 0})
+    assert [p['title'] for p in board.iter_posts(fields=('id', 'title'))] == ['옛 제목', '키 순서가 옛날', '새 줄']
+    stats = board.decode_stats()
+    new_head = lines[2].encode('utf-8').index(b', "content": ')
+    assert stats['bytes_read'] == sum(len(line.encode('utf-8')) + 1 for line in lines)
+    assert stats['bytes_decoded'] == stats['bytes_read'] - len(lines[2].encode('utf-8')) - 1 + new_head
+
+
+# 💜 HTTP 캐시 검증: 바뀌지 않은 목록/글은 304, 그 글이 바뀌면 200, 다른 글이 바뀌어도 글 페이지는 304
+def test_etag_revalidation_for_board_and_post(data_dir, monkeypatch):
+    store = board.get_store()
+    post_id = store.save_post('제목', '본문')
+    other_id = store.save_post('다른 글', '본문')
+    client = board.app.test_client()
+    board_etag = client.get('/board').headers['ETag']
+    first = client.get(f'/post/{post_id}')
+    assert first.status_code == 200
+    post_etag = first.headers['ETag']
+    assert client.get('/board', headers={'If-None-Match': board_etag}).status_code == 304
+    assert client.get(f'/post/{post_id}', headers={'If-None-Match': post_etag}).status_code == 304
+
+    # 다른 글에 댓글: 목록은 다시 보내고, 이 글 페이지는 그대로 304
+    client.post(f'/post/{other_id}/comment', data={'comment': '다른 글 댓글'})
+    assert client.get('/board', headers={'If-None-Match': board_etag}).status_code == 200
+    assert client.get(f'/post/{post_id}', headers={'If-None-Match': post_etag}).status_code == 304
+
+    # 이 글에 댓글: 200 + 새 ETag
+    client.post(f'/post/{post_id}/comment', data={'comment': '이 글 댓글'})
+    changed = client.get(f'/post/{post_id}', headers={'If-None-Match': post_etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != post_etag
+    assert '이 글 댓글' in changed.get_data(as_text=True)
+
+    # If-None-Match가 있으면 If-Modified-Since는 보지 않음 (옛 ETag + 미래 시각이어도 200)
+    future = 'Fri, 01 Jan 2100 00:00:00 GMT'
+    response = client.get(f'/post/{post_id}', headers={'If-None-Match': post_etag, 'If-Modified-Since': future})
+    assert response.status_code == 200
+
+    # 방금(1초 안에) 바뀐 파일은 Last-Modified를 보내지 않고 If-Modified-Since만으로는 304를 주지 않음
+    response = client.get('/board', headers={'If-Modified-Since': future})
+    assert response.status_code == 200 and response.last_modified is None
+    now = board.time.time()
+    monkeypatch.setattr(board.time, 'time', lambda: now + 5)
+    response = client.get('/board')
+    assert response.last_modified is not None
+    assert client.get('/board', headers={'If-Modified-Since': future}).status_code == 304
+
+
+def test_post_etag_is_taken_before_the_page_is_read(data_dir, monkeypatch):
+    # 읽는 도중 댓글이 달려도 그 응답에는 읽기 전 버전의 ETag -> 다음 재검증은 304가 아니라 새 내용
+    store = board.get_store()
+    post_id = store.save_post('제목', '본문')
+    real_load_post = board.load_post
+    raced = []
+
+    def load_post_after_a_comment(pid):
+        if not raced:
+            raced.append(pid)
+            board.add_comment(pid, '읽는 도중 댓글')
+        return real_load_post(pid)
+
+    monkeypatch.setattr(board, 'load_post', load_post_after_a_comment)
+    client = board.app.test_client()
+    raced_etag = client.get(f'/post/{post_id}').headers['ETag']
+    response = client.get(f'/post/{post_id}', headers={'If-None-Match': raced_etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != raced_etag
+
+
+# 💜 /board 페이지 나누기: ?page= 번호 방식, ?after= 커서 방식(지운 글 id를 넘어서), 전체 개수
+def _board_page(client, query):
+    html = client.get(f'/board?{query}').get_data(as_text=True)
+    titles = re.findall(r'>(글\d+)</a>', html)
+    cursor = re.search(r'after=(\d+)', html)
+    total = int(re.search(r'전체 (\d+)개', html).group(1))
+    return titles, cursor and int(cursor.group(1)), total
+
+
+def test_board_pagination_by_page_and_cursor(data_dir):
+    store = board.get_store()
+    ids = [store.save_post(f'글{n}', '본문') for n in range(1, 8)]
+    client = board.app.test_client()
+    for post_id in ids[3:5]:
+        client.post(f'/post/{post_id}/delete')
+
+    assert _board_page(client, 'page=1&per_page=2') == (['글1', '글2'], ids[1], 5)
+    assert _board_page(client, 'page=2&per_page=2') == (['글3', '글6'], ids[5], 5)
+    assert _board_page(client, 'page=3&per_page=2') == (['글7'], None, 5)
+    assert '3 / 3' in client.get('/board?page=3&per_page=2').get_data(as_text=True)
+
+    # 다음 링크(커서)를 따라가면 지운 글은 건너뛰고 같은 글들
+    assert _board_page(client, f'after={ids[2]}&per_page=2') == (['글6', '글7'], None, 5)
+    assert _board_page(client, f'after={ids[3]}&per_page=2') == (['글6', '글7'], None, 5) # 지운 글 id가 커서여도
+    assert _board_page(client, f'after={ids[6]}&per_page=2') == ([], None, 5)
+
+
+# 💜 flask migrate: 구형 '제목|||내용' 줄과 JSON 줄이 섞인 파일 -> 형식 헤더 + JSONL, 글 id/내용은 그대로
+def test_migrate_command_converts_mixed_legacy_file(data_dir):
+    lines = [
+        '옛 제목|||옛 내용',
+        json.dumps({'id': 2, 'title': 'JSON 글', 'content': '줄바꿈\n본문', 'comments': ['옛 댓글']}, ensure_ascii=False),
+        '두 번째 옛 글|||내용에 ||| 구분자',
+        json.dumps({'id': 7, 'title': '마지막', 'content': '본문', 'comments': []}, ensure_ascii=False),
+    ]
+    Path(board.FILE_PATH).write_text(''.join(line + '\n' for line in lines), encoding='utf-8')
+    store = board.get_store()
+    before = [(p.id, p.title, p.content, [c.text for c in p.comments]) for p in store.iter_posts()]
+    assert [b[1] for b in before] == ['옛 제목', 'JSON 글', '두 번째 옛 글', '마지막']
+
+    runner = board.app.test_cli_runner()
+    assert runner.invoke(board.migrate_command).output == 'migrated to format 2: 2 legacy lines converted\n'
+    with open(board.FILE_PATH, 'rb') as f:
+        assert json.loads(f.readline())['format'] == 2
+        assert all(json.loads(raw) for raw in f) # 나머지도 모두 JSON
+    assert [(p.id, p.title, p.content, [c.text for c in p.comments]) for p in store.iter_posts()] == before
+    assert runner.invoke(board.migrate_command).output == 'already migrated (format 2)\n'